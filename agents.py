@@ -4,20 +4,63 @@ Following the DeepJudge assignment specifications
 """
 
 import os
-import json
-from typing import List, Dict, Any, Optional
+import re
+import math
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 from dotenv import load_dotenv
+from circuit_breaker import BreakerConfig, CircuitBreaker, CircuitOpenError
+from gazetteer import find_law_firms
+from prompt_registry import REGISTRY, CompiledPrompt
+from system_prompts import LLM2_OUTPUT_FORMAT
 
 load_dotenv()
 
+UNKNOWN = "unknown"
+
+# Transient upstream errors: they count against a stage's circuit breaker
+UPSTREAM_FAILURES = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+# Errors after which a stage answers in degraded mode from local paths instead;
+# anything else (bad key, bad request) is a real error and propagates
+LLM_UNAVAILABLE = (CircuitOpenError,) + UPSTREAM_FAILURES
+
 @dataclass
 class ParagraphAnalysis:
     buyer_firm: str
     seller_firm: str
     third_party: str
     contains_target: bool
+    buyer: str = UNKNOWN
+    seller: str = UNKNOWN
+
+    def firms(self) -> Dict[str, str]:
+        """Role -> firm for every role with an identified firm"""
+        roles = {"buyer": self.buyer_firm, "seller": self.seller_firm, "third_party": self.third_party}
+        return {role: firm for role, firm in roles.items() if firm != UNKNOWN}
+
+    def to_text(self, number: int) -> str:
+        """Render in LLM2's output format so LLM3 can consume locally produced analyses"""
+        def shown(value: str, missing: str) -> str:
+            return missing if value == UNKNOWN else value
+        return "\n".join([
+            f"Paragraph {number} Analysis:",
+            f"Buyer: {shown(self.buyer, 'Not identified')}",
+            f"Buyer Representative: {shown(self.buyer_firm, 'Not stated')}",
+            f"Seller: {shown(self.seller, 'Not identified')}",
+            f"Seller Representative: {shown(self.seller_firm, 'Not stated')}",
+            f"Third-Party Representation: {shown(self.third_party, 'None')}",
+        ])
+
+    def to_compact(self, number: int) -> str:
+        """Render in LLM2's compact wire format: one line, non-empty fields only"""
+        fields = [str(number)]
+        for key, value in (("B", self.buyer), ("BR", self.buyer_firm), ("S", self.seller),
+                           ("SR", self.seller_firm), ("T", self.third_party)):
+            if value != UNKNOWN:
+                fields.append(f"{key}={value}")
+        return "|".join(fields) if len(fields) > 1 else f"{number}|"
     
 @dataclass
 class FinalOutput:
@@ -26,192 +69,264 @@ class FinalOutput:
     third_party: str
     contains_target_firm: bool
 
+@dataclass
+class LLMResponse:
+    content: str
+    model: str
+    token_logprobs: Optional[List[float]] = None
+    token_offsets: Optional[List[int]] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None         # prompt tokens served from the provider's prefix cache
+    prompt: Optional[CompiledPrompt] = None     # set by LLMAgent.call
+
+    def usage(self) -> Dict[str, Any]:
+        """Per-call token record: actual usage plus the registry's estimate of the static prefix"""
+        return {
+            "prompt": self.prompt.name if self.prompt else None,
+            "prompt_version": self.prompt.version if self.prompt else None,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_tokens,
+            "static_prefix_tokens_estimate": self.prompt.static_tokens if self.prompt else None,
+            "completion_tokens": self.completion_tokens,
+        }
+
+    def confidence(self, start: int = 0, end: Optional[int] = None) -> Optional[float]:
+        """Geometric-mean token probability over content[start:end], None without logprobs"""
+        if not self.token_logprobs:
+            return None
+        end = len(self.content) if end is None else end
+        selected = [logprob for offset, logprob in zip(self.token_offsets, self.token_logprobs)
+                    if start <= offset < end]
+        if not selected:
+            return None
+        return math.exp(sum(selected) / len(selected))
+
 class LLMAgent:
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.2):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    prompt_name: Optional[str] = None   # key in prompt_registry.REGISTRY
+
+    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.2,
+                 request_timeout: float = 60.0, breaker: Optional[BreakerConfig] = None):
+        # A bounded timeout so a hung request fails (and counts against the breaker) instead of blocking
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=request_timeout)
         self.model = model
         self.temperature = temperature
-    
-    def query(self, system_prompt: str, user_message: str) -> str:
+        self.breaker = CircuitBreaker(type(self).__name__, breaker, failures=UPSTREAM_FAILURES)
+
+    @property
+    def prompt(self) -> CompiledPrompt:
+        return REGISTRY.get(self.prompt_name)
+
+    @property
+    def system_prompt(self) -> str:
+        return self.prompt.system
+
+    def call(self, user_message: str, model: Optional[str] = None, logprobs: bool = False) -> LLMResponse:
+        """
+        Send this agent's compiled prompt; the response carries the prompt version and usage
+
+        Runs under the agent's circuit breaker: raises CircuitOpenError without
+        calling the API while the breaker is open (see LLM_UNAVAILABLE).
+        """
+        prompt = self.prompt
+        response = self.breaker.call(
+            lambda: self.complete(prompt.system, user_message, model=model, logprobs=logprobs))
+        response.prompt = prompt
+        return response
+
+    def query(self, system_prompt: str, user_message: str, model: Optional[str] = None) -> str:
+        return self.breaker.call(lambda: self.complete(system_prompt, user_message, model=model)).content
+
+    def complete(self, system_prompt: str, user_message: str, model: Optional[str] = None,
+                 logprobs: bool = False) -> LLMResponse:
+        """Like query, but keeps the model used and (optionally) per-token logprobs"""
+        options = {"logprobs": True} if logprobs else {}
         response = self.client.chat.completions.create(
-            model=self.model,
+            model=model or self.model,
             temperature=self.temperature,
+            # Static system prompt first, so calls share a prefix (cached once it reaches
+            # PROVIDER_CACHE_MIN_TOKENS, see prompt_registry.py)
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_message}
-            ]
+            ],
+            **options
         )
-        return response.choices[0].message.content
+        choice = response.choices[0]
+        result = LLMResponse(content=choice.message.content or "", model=response.model)
+        if response.usage:
+            result.prompt_tokens = response.usage.prompt_tokens
+            result.completion_tokens = response.usage.completion_tokens
+            details = getattr(response.usage, "prompt_tokens_details", None)
+            result.cached_tokens = getattr(details, "cached_tokens", None)
+        if logprobs and choice.logprobs and choice.logprobs.content:
+            offsets, values, position = [], [], 0
+            for token in choice.logprobs.content:
+                offsets.append(position)
+                values.append(token.logprob)
+                position += len(token.token)
+            result.token_offsets, result.token_logprobs = offsets, values
+        return result
 
 class LLM1Agent(LLMAgent):
     """Step 1: Determines if the user's query mentions any target company"""
-    
-    def __init__(self):
-        super().__init__()
-        self.system_prompt = """You are tasked with identifying whether a user query mentions any target company that needs to be searched for in legal documents.
 
-Your task:
-1. Analyze the user query to determine if it mentions a specific company name that should be treated as a "target company"
-2. A target company is typically a specific business entity, law firm, or organization that the user wants to find in legal documents
+    prompt_name = "LLM1"
 
-Response format - FOLLOW EXACTLY:
-- If NO target company is found: You MUST respond with EXACTLY this format: <user_message>Query is not relevant to the intended task.</user_message>
-- If a target company IS found: You MUST respond with EXACTLY this format: The target company is [COMPANY NAME].
+    def build_user_message(self, user_query: str) -> str:
+        return self.prompt.render(user_query=user_query)
 
-CRITICAL: 
-- For irrelevant queries (weather, cooking, general questions, etc.), you MUST use the XML format with <user_message> tags
-- For target company queries, do NOT use XML tags, just the plain text format
-- Be precise and follow the format exactly
-- Look for specific company names, law firms, or business entities in the query"""
-
-    def process(self, user_query: str) -> str:
-        return self.query(self.system_prompt, user_query)
+    def process(self, user_query: str, model: Optional[str] = None) -> str:
+        return self.call(self.build_user_message(user_query), model=model).content
 
 class LLM2Agent(LLMAgent):
-    """Step 2: Examines four separate paragraphs independently to extract law firm information"""
+    """Step 2: Examines each paragraph it is sent independently to extract law firm information"""
     
-    def __init__(self):
+    def __init__(self, output_format: Optional[str] = None):
         super().__init__()
-        self.system_prompt = """You are tasked with analyzing four separate paragraphs from a legal document independently to extract information about law firms and target company presence.
-
-For each of the four paragraphs provided, extract the following information:
-
-1. Buyer's representative law firm (the law firm representing the buyer/purchaser)
-2. Seller's representative law firm (the law firm representing the seller)  
-3. Any third-party law firm present (law firms representing other parties or serving advisory roles)
-4. Whether the target company is mentioned in the paragraph
-
-Instructions:
-- Analyze each paragraph independently 
-- Look for law firm names (typically ending in LLP, LLC, PC, or similar)
-- Identify which party each law firm represents based on context
-- A law firm name alone without clear representation context should be considered third-party
-- Be precise in identifying the actual law firm names
-
-Output format for each paragraph (follow exactly):
-Paragraph 1 Analysis:
-Buyer: [Company Name or "Not identified"]
-Buyer Representative: [Law Firm Name or "Not stated"]
-Seller: [Company Name or "Not identified"] 
-Seller Representative: [Law Firm Name or "Not stated"]
-Third-Party Representation: [Description and Law Firm Name or "None"]
-Target Company Mentioned: [Yes/No]
-
-Paragraph 2 Analysis:
-Buyer: [Company Name or "Not identified"]
-Buyer Representative: [Law Firm Name or "Not stated"]
-Seller: [Company Name or "Not identified"] 
-Seller Representative: [Law Firm Name or "Not stated"]
-Third-Party Representation: [Description and Law Firm Name or "None"]
-Target Company Mentioned: [Yes/No]
-
-Paragraph 3 Analysis:
-Buyer: [Company Name or "Not identified"]
-Buyer Representative: [Law Firm Name or "Not stated"]
-Seller: [Company Name or "Not identified"] 
-Seller Representative: [Law Firm Name or "Not stated"]
-Third-Party Representation: [Description and Law Firm Name or "None"]
-Target Company Mentioned: [Yes/No]
-
-Paragraph 4 Analysis:
-Buyer: [Company Name or "Not identified"]
-Buyer Representative: [Law Firm Name or "Not stated"]
-Seller: [Company Name or "Not identified"] 
-Seller Representative: [Law Firm Name or "Not stated"]
-Third-Party Representation: [Description and Law Firm Name or "None"]
-Target Company Mentioned: [Yes/No]"""
-
-    def process(self, paragraphs: List[str], target_company: str) -> str:
-        user_message = f"Target company to look for: {target_company}\n\n"
-        for i, paragraph in enumerate(paragraphs, 1):
-            user_message += f"Paragraph {i}:\n{paragraph}\n\n"
-        return self.query(self.system_prompt, user_message)
+        self.output_format = output_format or LLM2_OUTPUT_FORMAT
+        if self.output_format not in ("verbose", "compact"):
+            raise ValueError(f"Unknown LLM2 output format: {self.output_format}")
+
+    @property
+    def prompt_name(self) -> str:
+        return "LLM2_COMPACT" if self.output_format == "compact" else "LLM2"
+
+    def build_user_message(self, paragraphs: List[str], paragraph_numbers: Optional[Sequence[int]] = None) -> str:
+        numbers = paragraph_numbers or range(1, len(paragraphs) + 1)
+        return self.prompt.render(items=({"number": i, "paragraph": paragraph}
+                                         for i, paragraph in zip(numbers, paragraphs)))
+
+    def process(self, paragraphs: List[str], model: Optional[str] = None) -> str:
+        """Target-agnostic analysis; target presence is matched locally (see target_matching.py)"""
+        return self.call(self.build_user_message(paragraphs), model=model).content
+
+    def split_sections(self, llm2_output: str) -> Dict[int, Tuple[int, int]]:
+        """Paragraph number -> character span of its analysis, in this agent's output format"""
+        if self.output_format == "compact":
+            return split_compact_sections(llm2_output)
+        return split_analysis_sections(llm2_output)
+
+    def parse_section(self, section: str) -> Optional[ParagraphAnalysis]:
+        if self.output_format == "compact":
+            return parse_compact_line(section)
+        return parse_paragraph_analysis(section)
+
+    def parse(self, llm2_output: str) -> Dict[int, ParagraphAnalysis]:
+        """Parse this agent's output into ParagraphAnalysis objects keyed by paragraph number"""
+        if self.output_format == "compact":
+            return parse_compact_analysis(llm2_output)
+        return parse_llm2_analysis(llm2_output)
 
 class LLM3Agent(LLMAgent):
     """Step 3: Compiles information from all paragraphs and outputs structured JSON"""
-    
-    def __init__(self):
-        super().__init__()
-        self.system_prompt = """You are tasked with compiling law firm information from multiple paragraph analyses into a single JSON object.
-
-You will receive the analysis results from multiple paragraphs. Your task is to:
-
-1. Identify the most consistent/accurate buyer's representative law firm across all paragraphs
-2. Identify the most consistent/accurate seller's representative law firm across all paragraphs  
-3. Identify any third-party law firms mentioned
-4. Determine if the target company was mentioned in any paragraph
-
-Default values:
-- If a law firm is not found or unclear: "unknown"
-- If target company presence is unclear: false
-
-Output ONLY a valid JSON object with exactly these keys:
-{
-  "buyer_firm": "string",
-  "seller_firm": "string", 
-  "third_party": "string",
-  "contains_target_firm": boolean
-}
-
-Important:
-- Output ONLY the JSON object, no additional text
-- Ensure valid JSON formatting (no trailing commas, proper quotes)
-- Use "unknown" for missing law firm information
-- Use actual law firm names when clearly identified
-- For third_party, include the most relevant third-party law firm name"""
-
-    def process(self, paragraph_analyses: List[str]) -> str:
-        user_message = "Paragraph analyses to compile:\n\n" + "\n\n---\n\n".join(paragraph_analyses)
-        return self.query(self.system_prompt, user_message)
-
-class MultiAgentOrchestrator:
-    """Orchestrates the 3-step LLM workflow for Target Company & Law Firm Identification"""
-    
-    def __init__(self):
-        self.llm1 = LLM1Agent()
-        self.llm2 = LLM2Agent()
-        self.llm3 = LLM3Agent()
-    
-    def process(self, user_query: str, paragraphs: List[str]) -> Dict[str, Any]:
-        """
-        Process user query and paragraphs through the 3-step workflow
-        
-        Args:
-            user_query: User's query to check for target company
-            paragraphs: List of paragraphs to analyze
-            
-        Returns:
-            Dict with final results or error message
-        """
-        # Step 1: Check for target company
-        step1_result = self.llm1.process(user_query)
-        
-        # If no target company found, return user message
-        if step1_result.startswith("<user_message>"):
-            return {"result": step1_result}
-        
-        # Extract target company name
-        target_company = step1_result.replace("The target company is ", "").rstrip(".")
-        
-        # Step 2: Analyze all 4 paragraphs independently in one LLM2 call
-        llm2_analysis = self.llm2.process(paragraphs, target_company)
-        
-        # Step 3: Compile final JSON from LLM2's analysis of all paragraphs
-        final_json = self.llm3.process([llm2_analysis])
-        
-        try:
-            # Validate JSON
-            final_result = json.loads(final_json)
-            return {
-                "target_company": target_company,
-                "llm2_analysis": llm2_analysis,
-                "final_result": final_result,
-                "raw_json": final_json
-            }
-        except json.JSONDecodeError:
-            return {
-                "error": "Failed to parse final JSON",
-                "raw_output": final_json,
-                "target_company": target_company,
-                "llm2_analysis": llm2_analysis
-            }
\ No newline at end of file
+
+    prompt_name = "LLM3"
+
+    def build_user_message(self, paragraph_analyses: List[str]) -> str:
+        return self.prompt.render(analyses="\n\n---\n\n".join(paragraph_analyses))
+
+    def process(self, paragraph_analyses: List[str], model: Optional[str] = None) -> str:
+        return self.call(self.build_user_message(paragraph_analyses), model=model).content
+
+_ANALYSIS_HEADER = re.compile(r"^[#*\s]*Paragraph\s+(\d+)\s+Analysis\s*:?[*\s]*$", re.I | re.M)
+_FIELD_LINE = re.compile(r"^[-*\s]*([A-Za-z][A-Za-z\- ]*?)[*\s]*:[*\s]*(.*?)\s*$")
+_MISSING_VALUES = {"", "not identified", "not stated", "none", "n/a", "unknown", "not applicable"}
+
+def split_analysis_sections(llm2_output: str) -> Dict[int, Tuple[int, int]]:
+    """Map paragraph number -> (start, end) character span of its section in LLM2's output"""
+    headers = list(_ANALYSIS_HEADER.finditer(llm2_output))
+    sections = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        end = following.start() if following else len(llm2_output)
+        sections[int(header.group(1))] = (header.start(), end)
+    return sections
+
+def _clean_value(value: str) -> str:
+    value = value.strip().strip('"[]').strip()
+    return UNKNOWN if value.lower().rstrip(".") in _MISSING_VALUES else value
+
+def _firm_value(value: str) -> str:
+    """Reduce a free-text field to the law firm name(s) it mentions"""
+    value = _clean_value(value)
+    if value == UNKNOWN:
+        return value
+    firms = find_law_firms(value)
+    return "; ".join(firms) if firms else value
+
+def parse_paragraph_analysis(section: str) -> Optional[ParagraphAnalysis]:
+    """Parse one "Paragraph N Analysis:" block; None when required fields are missing"""
+    fields = {}
+    for line in section.splitlines():
+        match = _FIELD_LINE.match(line)
+        if match:
+            fields[match.group(1).strip().lower()] = match.group(2)
+    required = ("buyer representative", "seller representative", "third-party representation")
+    if not all(key in fields for key in required):
+        return None
+    return ParagraphAnalysis(
+        buyer_firm=_firm_value(fields["buyer representative"]),
+        seller_firm=_firm_value(fields["seller representative"]),
+        third_party=_firm_value(fields["third-party representation"]),
+        contains_target=False,
+        buyer=_clean_value(fields.get("buyer", "")),
+        seller=_clean_value(fields.get("seller", "")),
+    )
+
+_COMPACT_LINE = re.compile(r"^(\d+)\|(.*)$", re.M)
+_COMPACT_FIELDS = {"B": "buyer", "BR": "buyer_firm", "S": "seller", "SR": "seller_firm", "T": "third_party"}
+
+def split_compact_sections(llm2_output: str) -> Dict[int, Tuple[int, int]]:
+    """Map paragraph number -> (start, end) span of its line in compact LLM2 output"""
+    return {int(match.group(1)): match.span() for match in _COMPACT_LINE.finditer(llm2_output)}
+
+def parse_compact_line(line: str) -> Optional[ParagraphAnalysis]:
+    """
+    Strictly parse one compact line such as "3|BR=Shearman & Sterling LLP|T=Jones Day"
+
+    Unknown keys, repeated keys, empty values or a malformed prefix reject the
+    whole line (None) rather than guessing, so the cascade can escalate it.
+    """
+    match = _COMPACT_LINE.match(line.strip())
+    if match is None:
+        return None
+    values = {}
+    for item in match.group(2).split("|"):
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        value = value.strip()
+        if not sep or not value:
+            return None
+        if key in _COMPACT_FIELDS and _COMPACT_FIELDS[key] not in values:
+            values[_COMPACT_FIELDS[key]] = value
+        else:
+            return None
+    # Compact values are bare names already, so no free-text firm extraction is needed
+    return ParagraphAnalysis(
+        buyer_firm=values.get("buyer_firm", UNKNOWN),
+        seller_firm=values.get("seller_firm", UNKNOWN),
+        third_party=values.get("third_party", UNKNOWN),
+        contains_target=False,
+        buyer=values.get("buyer", UNKNOWN),
+        seller=values.get("seller", UNKNOWN),
+    )
+
+def parse_compact_analysis(llm2_output: str) -> Dict[int, ParagraphAnalysis]:
+    """Parse compact LLM2 output; malformed lines are dropped"""
+    analyses = {}
+    for number, (start, end) in split_compact_sections(llm2_output).items():
+        analysis = parse_compact_line(llm2_output[start:end])
+        if analysis is not None:
+            analyses[number] = analysis
+    return analyses
+
+def parse_llm2_analysis(llm2_output: str) -> Dict[int, ParagraphAnalysis]:
+    """Parse LLM2's verbose output into ParagraphAnalysis objects keyed by paragraph number"""
+    analyses = {}
+    for number, (start, end) in split_analysis_sections(llm2_output).items():
+        analysis = parse_paragraph_analysis(llm2_output[start:end])
+        if analysis is not None:
+            analyses[number] = analysis
+    return analyses
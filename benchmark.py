@@ -0,0 +1,178 @@
+"""
+Benchmarks for the DeepJudge multi-agent system
+Compares completion-token counts of the verbose and compact LLM2 wire formats on
+the sample paragraphs (with --live, also real completion tokens and latency), and
+the size and write time of pretty-printed JSON results against the results store,
+and ingestion throughput (MB/s, paragraphs/s) on a synthetic corpus
+"""
+
+import calendar
+import json
+import os
+import re
+import sys
+import tempfile
+import textwrap
+import time
+from agents import LLM2Agent, ParagraphAnalysis, UNKNOWN, parse_compact_analysis, parse_llm2_analysis
+from gazetteer import KNOWN_LAW_FIRMS
+from ingestion import IngestionStats, ingest, iter_paragraphs
+from main import SAMPLE_PARAGRAPHS
+from results_store import CODECS, ResultsStore
+from tokens import estimate_tokens
+
+# Expected analysis of the sample paragraphs, used to render both formats offline
+SAMPLE_ANALYSES = [
+    ParagraphAnalysis(UNKNOWN, UNKNOWN, "Gibson, Dunn & Crutcher LLP", False,
+                      buyer="Ecolab Inc.", seller="Purolite Corporation"),
+    ParagraphAnalysis(UNKNOWN, UNKNOWN, UNKNOWN, False),
+    ParagraphAnalysis("Shearman & Sterling LLP", "Cleary Gottlieb Steen & Hamilton LLP",
+                      "Gibson, Dunn & Crutcher LLP", False),
+    ParagraphAnalysis(UNKNOWN, UNKNOWN, UNKNOWN, False),
+]
+
+def compare_formats_offline():
+    """Render the same analyses in both formats and compare estimated tokens and parse time"""
+    verbose = "\n\n".join(a.to_text(i) for i, a in enumerate(SAMPLE_ANALYSES, 1))
+    compact = "\n".join(a.to_compact(i) for i, a in enumerate(SAMPLE_ANALYSES, 1))
+
+    print("=== LLM2 Output Format Comparison (estimated tokens) ===")
+    rows = []
+    for name, text, parser in (("verbose", verbose, parse_llm2_analysis),
+                               ("compact", compact, parse_compact_analysis)):
+        assert list(parser(text).values()) == SAMPLE_ANALYSES, f"{name} round-trip failed"
+        runs = 2000
+        start = time.perf_counter()
+        for _ in range(runs):
+            parser(text)
+        parse_us = (time.perf_counter() - start) / runs * 1e6
+        rows.append((name, estimate_tokens(text), len(text), parse_us))
+
+    for name, tokens, chars, parse_us in rows:
+        print(f"{name:<8} {tokens:>5} tokens  {chars:>5} chars  parse {parse_us:7.1f} us")
+    verbose_tokens, compact_tokens = rows[0][1], rows[1][1]
+    print(f"Compact format saves {1 - compact_tokens / verbose_tokens:.0%} of completion tokens")
+
+    print("\nCompact output:")
+    print(compact)
+
+def compare_formats_live():
+    """Run LLM2 on the sample paragraphs in both formats and report real usage and latency"""
+    print("\n=== LLM2 Output Format Comparison (live API) ===")
+    for output_format in ("verbose", "compact"):
+        agent = LLM2Agent(output_format=output_format)
+        user_message = agent.build_user_message(SAMPLE_PARAGRAPHS)
+        start = time.perf_counter()
+        response = agent.call(user_message)
+        elapsed = time.perf_counter() - start
+        parsed = agent.parse(response.content)
+        print(f"{output_format:<8} {response.completion_tokens:>5} completion tokens  "
+              f"{response.cached_tokens or 0:>5} cached prompt tokens  "
+              f"{elapsed:6.2f} s  {len(parsed)}/{len(SAMPLE_PARAGRAPHS)} paragraphs parsed")
+
+# Names in the recorded result that are swapped out per variant
+_TEMPLATE_NAMES = ["Ecolab Inc.", "Ecolab", "Purolite Corporation", "Purolite", "October 28, 2021"]
+_TEMPLATE_FIRMS = ["Shearman & Sterling LLP", "Cleary Gottlieb Steen & Hamilton LLP", "Gibson, Dunn & Crutcher LLP"]
+
+def _distinct_results(template: dict, count: int) -> list:
+    """
+    count variants of a recorded result, each with its own parties, counsel and date
+
+    The boilerplate paragraphs stay shared, as they would across real
+    agreements, so paragraph deduplication is measured on a realistic mix
+    rather than on one record copied count times.
+    """
+    firms = [firm for firm in KNOWN_LAW_FIRMS if firm not in _TEMPLATE_FIRMS]
+    text = json.dumps(template)
+    pattern = re.compile("|".join(re.escape(name) for name in
+                                  sorted(_TEMPLATE_NAMES + _TEMPLATE_FIRMS, key=len, reverse=True)))
+    results = []
+    for i in range(count):
+        replacements = {
+            "Ecolab Inc.": f"Buyer {i} Inc.", "Ecolab": f"Buyer {i}",
+            "Purolite Corporation": f"Seller {i} Corporation", "Purolite": f"Seller {i}",
+            "October 28, 2021": f"{calendar.month_name[i % 12 + 1]} {i % 28 + 1}, {2000 + i % 25}",
+        }
+        for offset, firm in enumerate(_TEMPLATE_FIRMS):
+            replacements[firm] = firms[(i * len(_TEMPLATE_FIRMS) + offset) % len(firms)]
+        result = json.loads(pattern.sub(lambda match: replacements[match.group(0)], text))
+        result["timestamp"] = f"2025-08-26T17:{i // 60 % 60:02d}:{i % 60:02d}"
+        results.append(result)
+    return results
+
+def compare_result_storage(count: int = 2000):
+    """Write distinct variants of the recorded end-to-end results as JSON and through the store"""
+    with open("test_results.json", encoding="utf-8") as f:
+        recorded = json.load(f)["results"]
+    template = next((r for r in recorded.values() if "input" in r), None)
+    if template is None:
+        print("\ntest_results.json holds no full results to vary; skipping storage benchmark")
+        return
+
+    results = _distinct_results(template, count)
+    paragraphs = len({p for result in results for p in result["input"]["paragraphs"]})
+    print(f"\n=== Result Storage Comparison ({count} results, {paragraphs} distinct paragraphs) ===")
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "results.json")
+        start = time.perf_counter()
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2, ensure_ascii=False)
+        json_seconds = time.perf_counter() - start
+        json_bytes = os.path.getsize(json_path)
+        print(f"{'json':<12} {json_bytes / 1024:9.1f} KiB  write {json_seconds * 1000:7.1f} ms")
+
+        for codec in CODECS:
+            store_dir = os.path.join(directory, codec)
+            start = time.perf_counter()
+            with ResultsStore(store_dir, codec=codec) as store:
+                for i, result in enumerate(results):
+                    store.add_result(f"run/{i}", result["test_type"], result["timestamp"],
+                                     result["input"]["user_query"], result["input"]["paragraphs"],
+                                     result["output"], result["validation"])
+            seconds = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(store_dir, name)) for name in os.listdir(store_dir))
+            print(f"store/{codec:<6} {size / 1024:9.1f} KiB  write {seconds * 1000:7.1f} ms  "
+                  f"({json_bytes / size:.0f}x smaller, {seconds / json_seconds:.1f}x the JSON write time)")
+
+def measure_ingestion(documents: int = 64, sections_per_document: int = 200, workers: int = None):
+    """Segment a synthetic corpus of wrapped agreements in-process and through the process pool"""
+    print("\n=== Ingestion Throughput ===")
+    section = "\n".join([
+        "ARTICLE I",
+        "\n".join(textwrap.wrap(SAMPLE_PARAGRAPHS[0], 78)),
+        "",
+        "\n".join(textwrap.wrap(SAMPLE_PARAGRAPHS[1], 78)),
+        "",
+        "Section 9.2 Notices",
+        SAMPLE_PARAGRAPHS[2],
+        "9.3 Interpretation. " + "\n".join(textwrap.wrap(SAMPLE_PARAGRAPHS[3], 78)),
+        "",
+    ])
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(documents):
+            path = os.path.join(directory, f"agreement-{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(section * sections_per_document)
+            paths.append(path)
+        total_mb = sum(os.path.getsize(path) for path in paths) / 1e6
+
+        start = time.perf_counter()
+        paragraphs = sum(1 for _ in iter_paragraphs(paths[0]))
+        seconds = time.perf_counter() - start
+        single_mb = os.path.getsize(paths[0]) / 1e6
+        print(f"{'1 process':<12} {single_mb / seconds:7.1f} MB/s  {paragraphs / seconds:9.0f} paragraphs/s")
+
+        stats = IngestionStats()
+        for _ in ingest(paths, workers=workers, stats=stats):
+            pass
+        report = stats.report()
+        print(f"{'pool':<12} {report['mb_per_s']:7.1f} MB/s  {report['paragraphs_per_s']:9.0f} paragraphs/s  "
+              f"({report['documents']} documents, {total_mb:.1f} MB)")
+
+if __name__ == "__main__":
+    compare_formats_offline()
+    compare_result_storage()
+    measure_ingestion()
+    if "--live" in sys.argv:
+        compare_formats_live()
@@ -0,0 +1,293 @@
+"""
+Confidence-based model cascade for the LLM2 and LLM3 stages
+Paragraphs are resolved by a local rule pass where possible, then by a small
+model, and escalated to a stronger model only when the small model's parsed
+output is ambiguous, inconsistent or low-confidence
+"""
+
+import json
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional, Tuple
+
+from agents import LLM2Agent, LLM3Agent, LLMResponse, ParagraphAnalysis, UNKNOWN, LLM_UNAVAILABLE
+from gazetteer import appears_in, find_law_firms, may_mention_counsel, mentions_law_firm, normalize_name
+from notice_blocks import extract_party_roles, is_defined_party, resolve_notice_paragraph
+
+SMALL_MODEL = "gpt-4o-mini"
+LARGE_MODEL = "gpt-4o"
+
+ROLE_KEYS = ("buyer_firm", "seller_firm", "third_party")
+
+@dataclass
+class RoutingDecision:
+    stage: str                      # "llm2" or "llm3"
+    route: str                      # "rule", "small", "large", "reused" or "degraded"
+    paragraph: Optional[int] = None
+    reasons: List[str] = field(default_factory=list)
+    confidence: Optional[float] = None
+
+@dataclass
+class CascadeResult:
+    analyses: List[ParagraphAnalysis]
+    raw_outputs: List[str] = field(default_factory=list)
+    decisions: List[RoutingDecision] = field(default_factory=list)
+    calls: List[Dict[str, Any]] = field(default_factory=list)     # LLMResponse.usage() per call
+    degraded: List[str] = field(default_factory=list)             # stages answered locally, LLM unavailable
+
+    def routing_summary(self) -> Dict[str, Any]:
+        """Per-request routing record: every decision plus LLM2 escalation rate"""
+        llm2 = [d for d in self.decisions if d.stage == "llm2"]
+        sent_to_llm = [d for d in llm2 if d.route in ("small", "large")]
+        escalated = [d for d in llm2 if d.route == "large"]
+        return {
+            "decisions": [asdict(d) for d in self.decisions],
+            "paragraph_routes": dict(Counter(d.route for d in llm2)),
+            "llm2_escalation_rate": len(escalated) / len(sent_to_llm) if sent_to_llm else 0.0,
+            "llm3_route": next((d.route for d in reversed(self.decisions) if d.stage == "llm3"), None),
+            "degraded": self.degraded,
+        }
+
+def compile_locally(analyses: List[ParagraphAnalysis]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Compile the final firm roles without LLM3 when the paragraph analyses agree
+
+    Returns (result, []) on success, or (None, reasons) when the analyses name
+    competing firms for a role and LLM3 has to arbitrate.
+    """
+    reasons = []
+    chosen = {}
+    for role in ROLE_KEYS:
+        firms = {}
+        for analysis in analyses:
+            value = getattr(analysis, role)
+            if value != UNKNOWN:
+                firms.setdefault(normalize_name(value), value)
+        if len(firms) > 1:
+            reasons.append(f"conflicting {role}")
+        chosen[role] = next(iter(firms.values()), UNKNOWN)
+
+    representatives = {normalize_name(chosen["buyer_firm"]), normalize_name(chosen["seller_firm"])}
+    if chosen["buyer_firm"] != UNKNOWN and len(representatives) == 1:
+        reasons.append("same firm on both sides")
+    if reasons:
+        return None, reasons
+
+    return chosen, []
+
+def compile_by_majority(analyses: List[ParagraphAnalysis]) -> Dict[str, Any]:
+    """Degraded-mode compilation: the most frequent firm per role, earliest first on ties"""
+    chosen = {}
+    for role in ROLE_KEYS:
+        counts, names = Counter(), {}
+        for analysis in analyses:
+            value = getattr(analysis, role)
+            if value != UNKNOWN:
+                counts[normalize_name(value)] += 1
+                names.setdefault(normalize_name(value), value)
+        chosen[role] = names[counts.most_common(1)[0][0]] if counts else UNKNOWN
+    return chosen
+
+def analyze_locally(paragraph: str, party_roles: Optional[Dict[str, str]] = None) -> ParagraphAnalysis:
+    """
+    Degraded-mode analysis from the gazetteer alone
+
+    Without LLM2 there is no representation context, so every firm found is
+    reported as third party, as LLM2's own instructions do for bare firm names.
+    LLC/PC names are often the parties themselves, so names defined as a party
+    (in party_roles, or "Acme Holdings LLC, as the Purchaser") are left out.
+    """
+    party_roles = {**extract_party_roles([paragraph]), **(party_roles or {})}
+    firms = [firm for firm in find_law_firms(paragraph) if not is_defined_party(firm, paragraph, party_roles)]
+    return ParagraphAnalysis(UNKNOWN, UNKNOWN, "; ".join(firms) if firms else UNKNOWN, False)
+
+def _roles_from_json(raw: str) -> Optional[Dict[str, Any]]:
+    """Firm roles from LLM3's JSON; its contains_target_firm is ignored in favour of local matching"""
+    try:
+        result = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(result, dict) or not all(key in result for key in ROLE_KEYS):
+        return None
+    return {key: result[key] for key in ROLE_KEYS}
+
+@dataclass
+class Extraction:
+    """Target-agnostic outcome of steps 2 and 3 for one paragraph set, reusable across targets"""
+    cascade_result: CascadeResult
+    roles: Optional[Dict[str, str]]     # None when LLM3's output could not be parsed
+    raw_json: str
+
+class ModelCascade:
+    """Routes LLM2/LLM3 work through rule -> small model -> large model"""
+
+    def __init__(self, llm2: Optional[LLM2Agent] = None, llm3: Optional[LLM3Agent] = None,
+                 small_model: str = SMALL_MODEL, large_model: str = LARGE_MODEL,
+                 confidence_threshold: float = 0.85, use_logprobs: bool = True):
+        self.llm2 = llm2 or LLM2Agent()
+        self.llm3 = llm3 or LLM3Agent()
+        self.small_model = small_model
+        self.large_model = large_model
+        self.confidence_threshold = confidence_threshold
+        self.use_logprobs = use_logprobs
+
+    def analyze(self, paragraphs: List[str],
+                reuse: Optional[Dict[int, Tuple[ParagraphAnalysis, RoutingDecision]]] = None) -> CascadeResult:
+        """
+        Step 2: produce one ParagraphAnalysis per paragraph, escalating only where needed
+
+        reuse maps paragraph index -> an earlier model analysis of the same text
+        (see revisions.py); those paragraphs skip the LLM. The rule pass still
+        runs for every paragraph since its party roles come from the whole set.
+        """
+        result = CascadeResult(analyses=[None] * len(paragraphs))
+        pending = []
+        reuse = reuse or {}
+        party_roles = extract_party_roles(paragraphs)
+        for i, paragraph in enumerate(paragraphs):
+            if not may_mention_counsel(paragraph):
+                result.analyses[i] = ParagraphAnalysis(UNKNOWN, UNKNOWN, UNKNOWN, False)
+                result.decisions.append(RoutingDecision("llm2", "rule", i + 1, ["no counsel mentioned"]))
+                continue
+            notice = resolve_notice_paragraph(paragraph, party_roles)
+            if notice is not None:
+                result.analyses[i] = notice
+                result.decisions.append(RoutingDecision("llm2", "rule", i + 1, ["notice-block rules"]))
+            elif i in reuse:
+                analysis, earlier = reuse[i]
+                result.analyses[i] = analysis
+                result.decisions.append(RoutingDecision("llm2", "reused", i + 1,
+                                                        [f"unchanged, earlier route {earlier.route}"],
+                                                        earlier.confidence))
+            else:
+                pending.append(i)
+
+        if not pending:
+            return result
+
+        try:
+            small = self._run_llm2(paragraphs, pending, self.small_model, result)
+        except LLM_UNAVAILABLE as exc:
+            result.degraded.append("llm2")
+            for i in pending:
+                result.analyses[i] = analyze_locally(paragraphs[i], party_roles)
+                result.decisions.append(RoutingDecision("llm2", "degraded", i + 1, [f"LLM2 unavailable: {exc}"]))
+            result.decisions.sort(key=lambda d: d.paragraph)
+            return result
+        issues = self._find_issues(paragraphs, small)
+        for i, (analysis, confidence) in small.items():
+            if i not in issues:
+                result.analyses[i] = analysis
+                result.decisions.append(RoutingDecision("llm2", "small", i + 1, [], confidence))
+
+        escalate = sorted(issues)
+        if escalate:
+            try:
+                large = self._run_llm2(paragraphs, escalate, self.large_model, result)
+            except LLM_UNAVAILABLE as exc:
+                # Keep the small model's answers where it gave one; they are flagged, not dropped
+                result.degraded.append("llm2")
+                for i in escalate:
+                    result.analyses[i] = small[i][0] or analyze_locally(paragraphs[i], party_roles)
+                    result.decisions.append(RoutingDecision("llm2", "degraded", i + 1,
+                                                            issues[i] + [f"large model unavailable: {exc}"],
+                                                            small[i][1]))
+                escalate = []
+            for i in escalate:
+                analysis, confidence = large.get(i, (None, None))
+                reasons = issues[i]
+                if analysis is None:
+                    # Keep whatever the small model produced rather than dropping the paragraph
+                    analysis = small[i][0] or ParagraphAnalysis(UNKNOWN, UNKNOWN, UNKNOWN, False)
+                    reasons = reasons + ["large model output unparseable"]
+                result.analyses[i] = analysis
+                result.decisions.append(RoutingDecision("llm2", "large", i + 1, reasons, confidence))
+
+        result.decisions.sort(key=lambda d: d.paragraph)
+        return result
+
+    def _run_llm2(self, paragraphs: List[str], indices: List[int], model: str,
+                  result: CascadeResult) -> Dict[int, Tuple[Optional[ParagraphAnalysis], Optional[float]]]:
+        user_message = self.llm2.build_user_message([paragraphs[i] for i in indices], [i + 1 for i in indices])
+        response = self.llm2.call(user_message, model=model, logprobs=self.use_logprobs)
+        result.raw_outputs.append(response.content)
+        result.calls.append(dict(response.usage(), stage="llm2"))
+        return self._parse_response(response, indices)
+
+    def _run_llm3(self, user_message: str, model: str, result: CascadeResult) -> str:
+        response = self.llm3.call(user_message, model=model)
+        result.calls.append(dict(response.usage(), stage="llm3"))
+        return response.content
+
+    def _parse_response(self, response: LLMResponse, indices: List[int]
+                       ) -> Dict[int, Tuple[Optional[ParagraphAnalysis], Optional[float]]]:
+        sections = self.llm2.split_sections(response.content)
+        parsed = {}
+        for i in indices:
+            span = sections.get(i + 1)
+            if span is None:
+                parsed[i] = (None, None)
+                continue
+            analysis = self.llm2.parse_section(response.content[span[0]:span[1]])
+            parsed[i] = (analysis, response.confidence(*span))
+        return parsed
+
+    def _find_issues(self, paragraphs: List[str],
+                     parsed: Dict[int, Tuple[Optional[ParagraphAnalysis], Optional[float]]]
+                     ) -> Dict[int, List[str]]:
+        """Paragraph index -> reasons its small-model analysis should be escalated"""
+        issues = defaultdict(list)
+        roles_by_firm = defaultdict(set)
+        for i, (analysis, confidence) in parsed.items():
+            if analysis is None:
+                issues[i].append("unparseable output")
+                continue
+            if confidence is not None and confidence < self.confidence_threshold:
+                issues[i].append(f"low confidence {confidence:.2f}")
+            firms = analysis.firms()
+            if not firms and mentions_law_firm(paragraphs[i]):
+                issues[i].append("law firm mentioned but none extracted")
+            for role, firm in firms.items():
+                if not all(appears_in(name, paragraphs[i]) for name in firm.split("; ")):
+                    issues[i].append(f"{role} not found in paragraph")
+                roles_by_firm[normalize_name(firm)].add((role, i))
+            if (analysis.buyer_firm != UNKNOWN
+                    and normalize_name(analysis.buyer_firm) == normalize_name(analysis.seller_firm)):
+                issues[i].append("same firm for buyer and seller")
+
+        for placements in roles_by_firm.values():
+            if len({role for role, _ in placements}) > 1:
+                for _, i in placements:
+                    issues[i].append("firm role inconsistent across paragraphs")
+        return dict(issues)
+
+    def extract(self, paragraphs: List[str]) -> Extraction:
+        """Steps 2 and 3 for a paragraph set, independent of any target company"""
+        result = self.analyze(paragraphs)
+        raw_json, roles = self.compile(result.analyses, result)
+        return Extraction(cascade_result=result, roles=roles, raw_json=raw_json)
+
+    def compile(self, analyses: List[ParagraphAnalysis], result: CascadeResult) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Step 3: local compilation when unambiguous, otherwise LLM3 small then large (majority vote if LLM3 is down)"""
+        final, reasons = compile_locally(analyses)
+        if final is not None:
+            result.decisions.append(RoutingDecision("llm3", "rule"))
+            return json.dumps(final), final
+
+        analysis_text = "\n\n".join(analysis.to_text(i) for i, analysis in enumerate(analyses, 1))
+        user_message = self.llm3.build_user_message([analysis_text])
+        try:
+            raw = self._run_llm3(user_message, self.small_model, result)
+            final = _roles_from_json(raw)
+            if final is not None:
+                result.decisions.append(RoutingDecision("llm3", "small", reasons=reasons))
+                return raw, final
+
+            raw = self._run_llm3(user_message, self.large_model, result)
+        except LLM_UNAVAILABLE as exc:
+            result.degraded.append("llm3")
+            final = compile_by_majority(analyses)
+            result.decisions.append(RoutingDecision("llm3", "degraded", reasons=reasons + [f"LLM3 unavailable: {exc}"]))
+            return json.dumps(final), final
+        result.decisions.append(RoutingDecision("llm3", "large", reasons=reasons + ["invalid JSON from small model"]))
+        return raw, _roles_from_json(raw)
@@ -0,0 +1,123 @@
+"""
+Circuit breaker for the LLM stages
+Trips when too many recent calls failed or were too slow, fails fast while
+open so requests do not pile up behind a degraded API, and lets a probe call
+through after a cool-down to restore normal service
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Optional, Tuple, Type, TypeVar
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while a breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+@dataclass
+class BreakerConfig:
+    window: int = 20                    # most recent calls considered
+    min_calls: int = 5                  # calls in the window before the breaker may trip
+    failure_rate: float = 0.5           # share of failed or slow calls that trips it
+    slow_call_seconds: float = 20.0     # a call slower than this counts as failed
+    open_seconds: float = 30.0          # fail-fast period before a half-open probe
+
+class CircuitBreaker:
+    """
+    Sliding-window breaker: closed -> open -> half-open -> closed
+
+    While half-open a single probe call is let through; its success closes
+    the breaker with a fresh window, its failure opens it again.
+
+    Only exceptions in failures count as failed calls. Any other exception
+    (a rejected request rather than an unavailable upstream) propagates
+    without being recorded.
+    """
+
+    def __init__(self, name: str, config: Optional[BreakerConfig] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 failures: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.name = name
+        self.config = config or BreakerConfig()
+        self.clock = clock
+        self.failures = failures
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._outcomes: "deque[bool]" = deque(maxlen=self.config.window)    # True = failed or slow
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.config.open_seconds - self.clock()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.config.open_seconds)
+                self._probing = True
+
+    def _record(self, failed: bool):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            failures = sum(self._outcomes)
+            if (len(self._outcomes) >= self.config.min_calls
+                    and failures / len(self._outcomes) >= self.config.failure_rate):
+                self._open()
+
+    def _release(self):
+        """End a call without recording an outcome; a half-open breaker lets the next probe through"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self._outcomes.clear()
+
+    def call(self, function: Callable[[], T]) -> T:
+        """Run function under the breaker; raises CircuitOpenError without calling it while open"""
+        self._acquire()
+        start = self.clock()
+        try:
+            result = function()
+        except self.failures:
+            self._record(failed=True)
+            raise
+        except BaseException:
+            self._release()
+            raise
+        self._record(failed=self.clock() - start > self.config.slow_call_seconds)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            failures = sum(self._outcomes)
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failure_rate": round(failures / len(self._outcomes), 2) if self._outcomes else 0.0,
+                "rejected": self.rejected,
+            }
@@ -5,7 +5,10 @@ Stores complete test results for validation and submission
 
 import json
 import datetime
-from agents import MultiAgentOrchestrator
+from orchestrator import MultiAgentOrchestrator
+from results_store import ResultsStore
+
+RESULTS_STORE_DIR = "test_results_store"
 
 def run_positive_test():
     """Run positive test case with expected target company and law firm detection"""
@@ -230,12 +233,28 @@ def save_test_results(positive_result, negative_result, custom_positive_result):
     summary["overall_status"] = "PASS" if all_passed else "FAIL"
     summary["summary"]["all_tests_passed"] = all_passed
     
+    # Full inputs/outputs go to the compact store (paragraphs deduplicated, blocks compressed);
+    # test_results.json only keeps the summary and the record IDs to look them up
+    record_ids = {}
+    with ResultsStore(RESULTS_STORE_DIR) as store:
+        for name, result in summary["results"].items():
+            record_id = f"{summary['timestamp']}/{name}"
+            store.add_result(record_id, result["test_type"], result["timestamp"],
+                             result["input"]["user_query"], result["input"]["paragraphs"],
+                             result["output"], result["validation"])
+            record_ids[name] = record_id
+    summary["results"] = {
+        name: {"record_id": record_ids[name], "status": result["validation"]["status"]}
+        for name, result in summary["results"].items()
+    }
+    summary["results_store"] = RESULTS_STORE_DIR
+    
     # Save to file
     with open('test_results.json', 'w') as f:
         json.dump(summary, f, indent=2, ensure_ascii=False)
     
     print(f"\n=== TEST RESULTS SAVED ===")
-    print(f"File: test_results.json")
+    print(f"File: test_results.json (records in {RESULTS_STORE_DIR}/)")
     print(f"Overall Status: {summary['overall_status']}")
     print(f"Tests Passed: {sum(summary['summary'].values())} / 3")
     
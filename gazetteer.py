@@ -0,0 +1,126 @@
+"""
+Local law firm gazetteer for the DeepJudge multi-agent system
+Detects law firm names in paragraph text without calling the LLM
+"""
+
+import re
+from typing import List
+
+# Well-known firms, including those whose names carry no LLP/LLC suffix
+KNOWN_LAW_FIRMS = (
+    "Baker McKenzie LLP",
+    "Cleary Gottlieb Steen & Hamilton LLP",
+    "Cravath, Swaine & Moore LLP",
+    "Davis Polk & Wardwell LLP",
+    "Debevoise & Plimpton LLP",
+    "Gibson, Dunn & Crutcher LLP",
+    "Jones Day",
+    "Kirkland & Ellis LLP",
+    "Latham & Watkins LLP",
+    "Paul, Weiss, Rifkind, Wharton & Garrison LLP",
+    "Shearman & Sterling LLP",
+    "Simpson Thacher & Bartlett LLP",
+    "Skadden, Arps, Slate, Meagher & Flom LLP",
+    "Sullivan & Cromwell LLP",
+    "Wachtell, Lipton, Rosen & Katz",
+    "White & Case LLP",
+    "Wilson Sonsini Goodrich & Rosati",
+)
+
+FIRM_SUFFIXES = r"(?:LLP|L\.L\.P\.|PLLC|LLC|L\.L\.C\.|P\.C\.|PC)"
+
+_NAME_WORD = r"[A-Z][A-Za-z.'\-]*"
+_FIRM_PATTERN = re.compile(
+    rf"{_NAME_WORD}(?:(?:,\s+|\s+&\s+|\s+){_NAME_WORD})*,?\s+{FIRM_SUFFIXES}(?![A-Za-z])"
+)
+
+# Capitalised sentence openers that the suffix pattern can swallow in front of a firm name
+_LEADING_NOISE = {"additionally", "also", "and", "attention", "by", "counsel", "further",
+                  "furthermore", "moreover", "the", "with"}
+
+_SUFFIX_ONLY = re.compile(rf",?\s+{FIRM_SUFFIXES}$")
+
+
+_NON_NAME_CHARS = re.compile(r"[^a-z0-9&]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case a name and collapse punctuation so textual variants compare equal"""
+    return _NON_NAME_CHARS.sub(" ", name.lower()).strip()
+
+
+def _gazetteer_key(firm: str) -> str:
+    return normalize_name(_SUFFIX_ONLY.sub("", firm))
+
+
+def _gazetteer_pattern(key: str) -> "re.Pattern[str]":
+    tokens = [re.escape(token) for token in key.split()]
+    return re.compile(r"(?<![A-Za-z0-9])" + r"[^A-Za-z0-9&]+".join(tokens) + r"(?![A-Za-z0-9])", re.I)
+
+
+_GAZETTEER = [(_gazetteer_key(firm), f" {_gazetteer_key(firm)} ", _gazetteer_pattern(_gazetteer_key(firm)), firm)
+              for firm in KNOWN_LAW_FIRMS]
+
+
+def _strip_leading_noise(name: str) -> str:
+    words = name.split(" ")
+    while len(words) > 2 and words[0].rstrip(",").lower() in _LEADING_NOISE:
+        words = words[1:]
+    return " ".join(words)
+
+
+def find_law_firms(text: str) -> List[str]:
+    """
+    Find law firm names in text, in order of first appearance
+
+    Gazetteer entries are matched on normalized text so that spacing and
+    punctuation differences do not matter; anything else ending in a firm
+    suffix (LLP, LLC, P.C., ...) is picked up by pattern.
+    """
+    found = []
+    seen = set()
+    normalized = f" {normalize_name(text)} "
+    for key, padded_key, pattern, firm in _GAZETTEER:
+        # Plain substring test first; the positional regex only runs on a hit
+        if padded_key in normalized:
+            match = pattern.search(text)
+            if match:
+                found.append((match.start(), firm))
+                seen.add(key)
+
+    for match in _FIRM_PATTERN.finditer(text):
+        firm = _strip_leading_noise(" ".join(match.group(0).split()))
+        key = _gazetteer_key(firm)
+        if key in seen or any(key.endswith(f" {known}") for known in seen):
+            continue
+        seen.add(key)
+        found.append((match.start(), firm))
+
+    return [firm for _, firm in sorted(found)]
+
+
+def mentions_law_firm(text: str) -> bool:
+    """True when the gazetteer or the suffix pattern finds a firm in text"""
+    return bool(find_law_firms(text))
+
+
+# Wording that introduces counsel even when the firm itself is not recognized
+_COUNSEL_CUES = re.compile(r"\b(?:represent|counsel|advis|cop(?:y|ies)\s+(?:\([^)]*\)\s+)?to\b)", re.I)
+# Capitalized "X & Y" runs, the usual shape of a firm name without a suffix ("Weil, Gotshal & Manges")
+_AMPERSAND_NAME = re.compile(r"[A-Z][\w'\-]*,?\s+&\s+[A-Z]")
+
+
+def may_mention_counsel(text: str) -> bool:
+    """
+    Cheap check used to decide whether a paragraph needs LLM analysis at all
+
+    The gazetteer covers few firms, so a paragraph only counts as free of
+    counsel when it also has no representation wording and no "X & Y" name.
+    """
+    return bool(_COUNSEL_CUES.search(text) or _AMPERSAND_NAME.search(text)) or mentions_law_firm(text)
+
+
+def appears_in(name: str, text: str) -> bool:
+    """True when name (ignoring firm suffix and punctuation) occurs in text"""
+    key = _gazetteer_key(name)
+    return bool(key) and f" {key} " in f" {normalize_name(text)} "
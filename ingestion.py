@@ -0,0 +1,222 @@
+"""
+Streaming document ingestion and paragraph segmentation
+Turns plain-text or PDF agreements into the paragraph strings the orchestrator
+expects: wrapped lines are joined, whitespace is normalized, headings and
+numbered sections start new paragraphs, and notice address blocks keep their
+line structure for notice_blocks.py
+"""
+
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Iterable, Iterator, Optional
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional dependency, only needed for PDF input
+    PdfReader = None
+
+HEADING, SECTION, NOTICE, TEXT = "heading", "section", "notice", "text"
+
+# Non-breaking and zero-width spaces, tabs and form feeds become plain spaces; soft hyphens go
+_WHITESPACE = str.maketrans({"\u00a0": " ", "\u2009": " ", "\u202f": " ", "\t": " ", "\f": " ",
+                             "\u200b": None, "\u00ad": None, "\r": None})
+_SPACES = re.compile(r" {2,}")
+
+_HEADING = re.compile(r"^(?:article|section|exhibit|schedule|annex)\s+[\dIVXLC]+[\d.]*\b", re.I)
+# "9.2 Notices", "9. Notices", "Section 9.2", "(a)", "(iv)"; not "1 Ecolab Place"
+_NUMBERED = re.compile(r"^(?:(?:section|§)\s*)?(?:\d+(?:\.\d+)+\.?|\d+\.|\([a-z]{1,4}\)|\(\d{1,2}\))\s+\S", re.I)
+# A numbered start only follows a line that closed a sentence or block, never a dangling reference
+_CLOSES_BLOCK = ".:;"
+_DANGLING_WORDS = {"section", "sections", "article", "and", "or", "of", "§"}
+_PAGE_ARTIFACT = re.compile(r"^(?:-?\s*\d{1,4}\s*-?|page\s+\d+(?:\s+of\s+\d+)?)$", re.I)
+_NOT_A_NOTICE_HEADER = re.compile(r"^(?:attention|attn|facsimile|fax|e-?mail|telephone|tel)\b", re.I)
+
+MAX_HEADING_CHARS = 70
+
+@dataclass
+class Paragraph:
+    text: str
+    kind: str           # HEADING, SECTION, NOTICE or TEXT
+
+def normalize_whitespace(line: str) -> str:
+    return _SPACES.sub(" ", line.translate(_WHITESPACE)).strip()
+
+def _is_heading(line: str, in_notice: bool) -> bool:
+    """"ARTICLE IX", "Section 9.2 Notices", or a short all-caps line outside notice blocks"""
+    if len(line) > MAX_HEADING_CHARS or line[-1] in ",;":
+        return False
+    if _HEADING.match(line):
+        return True
+    # Inside a notice block all-caps lines are addresses ("NEW YORK, NEW YORK 10022")
+    return not in_notice and line.isupper() and any(c.isalpha() for c in line)
+
+class _ParagraphBuilder:
+    """Accumulates lines of one paragraph; prose lines are joined, notice lines keep their breaks"""
+
+    def __init__(self):
+        self.pieces: List[str] = []
+        self.kind = TEXT
+        self.in_notice = False
+        self.width = 0      # widest line seen, to spot short closing lines of prose paragraphs
+
+    def add(self, line: str):
+        if not self.pieces:
+            self.pieces.append(line)
+        elif self.in_notice:
+            self.pieces.append("\n" + line)
+        elif self.pieces[-1].endswith("-") and line[0].islower():
+            self.pieces.append(line)        # re-join a hyphenated line break
+        else:
+            self.pieces.append(" " + line)
+        self.width = max(self.width, len(line))
+        if line.endswith(":") and not _NOT_A_NOTICE_HEADER.match(line):
+            self.in_notice = True
+            self.kind = NOTICE
+
+    def ends_prose_paragraph(self) -> bool:
+        """A short line ending a sentence closes a paragraph even without a blank line"""
+        last = self.pieces[-1] if self.pieces else ""
+        return (not self.in_notice and self.width >= 40 and last[-1:] in ".!?\""
+                and len(last.lstrip()) < 0.6 * self.width)
+
+    def accepts_numbered_start(self) -> bool:
+        """Whether a numbered line can open a new section here rather than continue a wrapped sentence"""
+        if not self.pieces or self.in_notice:
+            return True     # notice lines are address lines, not wrapped prose
+        last = self.pieces[-1].rstrip()
+        words = last.split()
+        return last[-1:] in _CLOSES_BLOCK and bool(words) and words[-1].lower() not in _DANGLING_WORDS
+
+    def take(self) -> Optional[Paragraph]:
+        if not self.pieces:
+            return None
+        paragraph = Paragraph("".join(self.pieces), self.kind)
+        self.__init__()
+        return paragraph
+
+def segment_lines(lines: Iterable[str]) -> Iterator[Paragraph]:
+    """
+    Segment a stream of raw lines into paragraphs, holding one paragraph at a time
+
+    Blank lines, headings and numbered section starts end the current
+    paragraph (a short line closing a sentence ends prose too); a numbered
+    line only starts a section after a blank line, a notice address line or
+    a line ending in ".", ":" or ";", so wrapped cross-references stay in
+    place. Page numbers are dropped. After a line ending in ":" (e.g.
+    "with a copy (which shall not constitute notice) to:") the paragraph
+    becomes a notice block and keeps one address line per line.
+    """
+    builder = _ParagraphBuilder()
+    for raw in lines:
+        line = normalize_whitespace(raw)
+        if not line:
+            paragraph = builder.take()
+            if paragraph:
+                yield paragraph
+            continue
+        if _PAGE_ARTIFACT.match(line):
+            continue
+        if _is_heading(line, builder.in_notice):
+            paragraph = builder.take()
+            if paragraph:
+                yield paragraph
+            yield Paragraph(line, HEADING)
+            continue
+        # "...arising under Section\n9.2 hereof" is a wrapped cross-reference, not a new section
+        numbered = _NUMBERED.match(line) is not None and builder.accepts_numbered_start()
+        if numbered or builder.ends_prose_paragraph():
+            paragraph = builder.take()
+            if paragraph:
+                yield paragraph
+            if numbered:
+                builder.kind = SECTION
+        builder.add(line)
+    paragraph = builder.take()
+    if paragraph:
+        yield paragraph
+
+def read_lines(path: str) -> Iterator[str]:
+    """Stream the lines of a text file, or of a PDF's extracted text page by page"""
+    if path.lower().endswith(".pdf"):
+        if PdfReader is None:
+            raise ImportError("PDF ingestion requires pypdf (pip install pypdf)")
+        for page in PdfReader(path).pages:
+            yield from (page.extract_text() or "").splitlines()
+            yield ""    # page boundary; segment_lines treats it like a blank line
+        return
+    with open(path, encoding="utf-8", errors="replace") as document:
+        yield from document
+
+def iter_paragraphs(path: str, include_headings: bool = False) -> Iterator[str]:
+    """Paragraph strings of one document, produced lazily"""
+    for paragraph in segment_lines(read_lines(path)):
+        if include_headings or paragraph.kind != HEADING:
+            yield paragraph.text
+
+@dataclass
+class IngestedDocument:
+    path: str
+    paragraphs: List[str]
+    bytes: int
+    seconds: float          # segmentation time in the worker
+
+@dataclass
+class IngestionStats:
+    documents: int = 0
+    bytes: int = 0
+    paragraphs: int = 0
+    worker_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    def add(self, document: IngestedDocument):
+        self.documents += 1
+        self.bytes += document.bytes
+        self.paragraphs += len(document.paragraphs)
+        self.worker_seconds += document.seconds
+        self.finished_at = time.perf_counter()
+
+    def report(self) -> dict:
+        """Wall-clock throughput across the pool"""
+        elapsed = max((self.finished_at or time.perf_counter()) - self.started_at, 1e-9)
+        return {
+            "documents": self.documents,
+            "megabytes": round(self.bytes / 1e6, 3),
+            "paragraphs": self.paragraphs,
+            "seconds": round(elapsed, 3),
+            "mb_per_s": round(self.bytes / 1e6 / elapsed, 2),
+            "paragraphs_per_s": round(self.paragraphs / elapsed, 1),
+        }
+
+def _ingest_document(path: str, include_headings: bool) -> IngestedDocument:
+    start = time.perf_counter()
+    paragraphs = list(iter_paragraphs(path, include_headings))
+    return IngestedDocument(path, paragraphs, os.path.getsize(path), time.perf_counter() - start)
+
+def ingest(paths: Iterable[str], workers: Optional[int] = None, include_headings: bool = False,
+           stats: Optional[IngestionStats] = None) -> Iterator[IngestedDocument]:
+    """
+    Segment many documents in a process pool, yielding them in input order
+
+    At most 2 x workers documents are in flight, so neither the path list nor
+    the segmented corpus is ever held in memory as a whole. Pass an
+    IngestionStats to collect throughput while consuming the generator.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for path in paths:
+            in_flight.append(pool.submit(_ingest_document, path, include_headings))
+            if len(in_flight) >= 2 * workers:
+                yield _collect(in_flight.popleft().result(), stats)
+        while in_flight:
+            yield _collect(in_flight.popleft().result(), stats)
+
+def _collect(document: IngestedDocument, stats: Optional[IngestionStats]) -> IngestedDocument:
+    if stats is not None:
+        stats.add(document)
+    return document
@@ -0,0 +1,41 @@
+"""
+Offline stand-ins for LLM calls, shared by the test files
+Replace an agent's complete() so tests run without OpenAI access
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+from collections import namedtuple
+from typing import Callable, List, Optional, Union
+
+from agents import LLM2Agent, LLMResponse
+from cascade import ModelCascade
+from orchestrator import MultiAgentOrchestrator
+
+StubCall = namedtuple("StubCall", "system_prompt user_message model")
+
+# A verbose LLM2 answer for the first sample paragraph
+SAMPLE_ANALYSIS = ("Paragraph 1 Analysis:\nBuyer: Ecolab Inc.\nBuyer Representative: Not stated\n"
+                   "Seller: Purolite Corporation\nSeller Representative: Not stated\n"
+                   "Third-Party Representation: Gibson, Dunn & Crutcher LLP")
+
+def stub_complete(reply: Union[str, Callable[[StubCall], str]],
+                  calls: Optional[List[StubCall]] = None) -> Callable[..., LLMResponse]:
+    """
+    Drop-in for LLMAgent.complete answering with reply
+
+    reply is the response text, or a function of the StubCall returning it
+    (it may raise to simulate an outage). Every call is appended to calls
+    when a list is given.
+    """
+    def complete(system_prompt, user_message, model=None, logprobs=False):
+        call = StubCall(system_prompt, user_message, model)
+        if calls is not None:
+            calls.append(call)
+        return LLMResponse(content=reply(call) if callable(reply) else reply, model=model)
+    return complete
+
+def compact_orchestrator(**kwargs) -> MultiAgentOrchestrator:
+    """Orchestrator whose LLM2 is built for the compact output format"""
+    return MultiAgentOrchestrator(cascade=ModelCascade(llm2=LLM2Agent(output_format="compact")), **kwargs)
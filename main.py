@@ -4,23 +4,20 @@ Tests with the sample data provided in the assignment
 """
 
 import json
-from agents import MultiAgentOrchestrator
+from orchestrator import MultiAgentOrchestrator
 
-def main():
-    """Test the multi-agent system with the provided sample data"""
-    
-    # Sample data from the assignment - exactly 4 paragraphs as specified
-    user_query = "Is Kirkland & Ellis present in the agreement?"
-    
-    paragraphs = [
-        # Paragraph 1
-        "This Stock and Asset Purchase Agreement is entered into as of October 28, 2021, among Purolite Corporation, a Delaware corporation, along with Stefan E. Brodie and Don B. Brodie (collectively referred to as the Sellers), and Ecolab Inc., a Delaware corporation, as the Purchaser. Additionally, Gibson, Dunn & Crutcher LLP, as an independent third-party representative, is engaged for specific advisory roles outlined in this Agreement.",
-        
-        # Paragraph 2  
-        "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Delaware, without giving effect to any choice or conflict of law provision. Each clause within this Agreement shall be interpreted independently, and the invalidity of one clause shall not affect the enforceability of the remaining provisions. Headings are for convenience only and shall not affect the interpretation of this Agreement. Nothing herein shall be construed as limiting or waiving any rights or obligations under applicable law unless expressly stated.",
-        
-        # Paragraph 3
-        """Such notices, demands, and other communications shall be directed to the Parties at their respective addresses. One Party may be contacted at:
+# Sample data from the assignment - exactly 4 paragraphs as specified
+SAMPLE_QUERY = "Is Kirkland & Ellis present in the agreement?"
+
+SAMPLE_PARAGRAPHS = [
+    # Paragraph 1
+    "This Stock and Asset Purchase Agreement is entered into as of October 28, 2021, among Purolite Corporation, a Delaware corporation, along with Stefan E. Brodie and Don B. Brodie (collectively referred to as the Sellers), and Ecolab Inc., a Delaware corporation, as the Purchaser. Additionally, Gibson, Dunn & Crutcher LLP, as an independent third-party representative, is engaged for specific advisory roles outlined in this Agreement.",
+
+    # Paragraph 2  
+    "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Delaware, without giving effect to any choice or conflict of law provision. Each clause within this Agreement shall be interpreted independently, and the invalidity of one clause shall not affect the enforceability of the remaining provisions. Headings are for convenience only and shall not affect the interpretation of this Agreement. Nothing herein shall be construed as limiting or waiving any rights or obligations under applicable law unless expressly stated.",
+
+    # Paragraph 3
+    """Such notices, demands, and other communications shall be directed to the Parties at their respective addresses. One Party may be contacted at:
 1 Ecolab Place
 St. Paul, Minnesota 55102
 Attention: General Counsel
@@ -44,10 +41,16 @@ Gibson, Dunn & Crutcher LLP
 200 Park Avenue
 New York, New York 10166
 Attention: Jane Smith""",
-        
-        # Paragraph 4
-        "All references to the singular include the plural and vice versa, and all references to any gender include all genders. The Parties agree that any ambiguities in the language of this Agreement shall not be construed against either Party. Section headings used in this Agreement are for reference only and shall not affect the meaning or interpretation of any provision."
-    ]
+
+    # Paragraph 4
+    "All references to the singular include the plural and vice versa, and all references to any gender include all genders. The Parties agree that any ambiguities in the language of this Agreement shall not be construed against either Party. Section headings used in this Agreement are for reference only and shall not affect the meaning or interpretation of any provision."
+]
+
+def main():
+    """Test the multi-agent system with the provided sample data"""
+    
+    user_query = SAMPLE_QUERY
+    paragraphs = SAMPLE_PARAGRAPHS
     
     print("=== DeepJudge Multi-Agent System ===")
     print("Target Company & Law Firm Identification\n")
@@ -74,6 +77,24 @@ Attention: Jane Smith""",
         else:
             print("Error:", result.get("error", "Unknown error"))
             print("Raw output:", result.get("raw_output", "None"))
+        
+        routing = result.get("routing")
+        if routing:
+            print("\n=== Model Routing ===")
+            for decision in routing["decisions"]:
+                where = f"Paragraph {decision['paragraph']}" if decision["paragraph"] else "Compilation"
+                reasons = f" ({'; '.join(decision['reasons'])})" if decision["reasons"] else ""
+                print(f"{decision['stage'].upper()} {where}: {decision['route']}{reasons}")
+            print(f"LLM2 escalation rate: {routing['llm2_escalation_rate']:.0%}")
+
+        if result.get("degraded"):
+            print(f"\nDEGRADED: answered locally for {', '.join(result['degraded_stages'])} (LLM unavailable)")
+
+        print("\n=== LLM Calls ===")
+        for call in result.get("llm_calls", []):
+            print(f"{call['stage'].upper()} {call['model']} prompt {call['prompt_version']}: "
+                  f"{call['prompt_tokens']} prompt tokens ({call['cached_prompt_tokens']} cached), "
+                  f"{call['completion_tokens']} completion tokens")
 
 def test_negative_case():
     """Test case where no target company is mentioned"""
@@ -0,0 +1,184 @@
+"""
+Rule-based notice-block extractor
+Resolves counsel roles in notice sections ("with a copy (which shall not
+constitute notice) to: <Law Firm>") without calling the LLM
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+
+from agents import ParagraphAnalysis, UNKNOWN
+from gazetteer import appears_in, find_law_firms, normalize_name
+
+BUYER, SELLER, THIRD_PARTY = "buyer", "seller", "third_party"
+
+_ROLE_WORDS = {
+    r"purchasers?|buyers?|acquir[eo]rs?": BUYER,
+    r"sellers?|vendors?": SELLER,
+}
+_ROLE_PATTERN = "|".join(_ROLE_WORDS)
+
+_COMPANY = re.compile(
+    r"[A-Z][\w&'\-]*(?:,?\s+(?:&\s+)?[A-Z][\w&'\-]*)*,?\s+"
+    r"(?:Corporation|Corp\.|Incorporated|Inc\.|L\.L\.C\.|LLC|Ltd\.|Limited|Company|Co\.|Holdings|plc|N\.V\.|S\.A\.|GmbH|AG)"
+)
+# "as the Purchaser", "(collectively referred to as the Sellers)", '(the "Buyer")'
+_ROLE_DEFINITION = re.compile(
+    rf"(?:\bas\s+|\(\s*)(?:the\s+)?[\"“]?({_ROLE_PATTERN})\b", re.I)
+# The same phrase right after a name: "Acme Holdings LLC, as the Purchaser"
+_ROLE_AFTER_NAME = re.compile(rf",?\s*{_ROLE_DEFINITION.pattern}", re.I)
+
+_HEADER = re.compile(r":\s*$")
+_COPY_HEADER = re.compile(r"\bcop(?:y|ies)\b", re.I)
+_THIRD_PARTY_HEADER = re.compile(r"third[\s-]+party", re.I)
+_NOT_A_HEADER = re.compile(r"^\s*(?:attention|attn|facsimile|fax|e-?mail|telephone|tel)\b", re.I)
+
+# Generic words that make poor distinctive tokens for a party name
+_GENERIC_TOKENS = {"the", "new", "first", "american", "national", "international", "global", "group"}
+
+@dataclass
+class NoticeBlock:
+    kind: str                       # "party", "copy_to" or "third_party"
+    header: str
+    lines: List[str] = field(default_factory=list)
+    role: Optional[str] = None      # resolved BUYER / SELLER / THIRD_PARTY
+    party: Optional[str] = None
+    firms: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join([self.header] + self.lines)
+
+def _role_for(word: str) -> Optional[str]:
+    for pattern, role in _ROLE_WORDS.items():
+        if re.fullmatch(pattern, word, re.I):
+            return role
+    return None
+
+def extract_party_roles(paragraphs: List[str]) -> Dict[str, str]:
+    """
+    Map party names to buyer/seller from definitions in the recitals
+
+    Each role phrase ("as the Purchaser", "(the Sellers)") is attached to the
+    nearest company name before it in the same sentence.
+    """
+    roles = {}
+    for paragraph in paragraphs:
+        for sentence in re.split(r"(?<=[a-z]{2}[.;])\s+(?=[A-Z])", paragraph):
+            companies = list(_COMPANY.finditer(sentence))
+            for definition in _ROLE_DEFINITION.finditer(sentence):
+                role = _role_for(definition.group(1))
+                preceding = [c for c in companies if c.end() <= definition.start()]
+                if role and preceding:
+                    name = preceding[-1].group(0)
+                    roles.setdefault(name, role)
+    return roles
+
+def is_defined_party(name: str, text: str, party_roles: Dict[str, str]) -> bool:
+    """True when name is a party of the deal rather than its counsel"""
+    if normalize_name(name) in {normalize_name(party) for party in party_roles}:
+        return True
+    pattern = re.compile(r"\s+".join(re.escape(word) for word in name.split()))
+    return any(_ROLE_AFTER_NAME.match(text, match.end()) for match in pattern.finditer(text))
+
+def _distinctive_token(party: str) -> Optional[str]:
+    tokens = [t for t in normalize_name(party).split() if len(t) >= 4 and t not in _GENERIC_TOKENS]
+    return tokens[0] if tokens else None
+
+def _match_party(text: str, party_roles: Dict[str, str]) -> Optional[str]:
+    """The single defined party a block refers to, by full name or distinctive token"""
+    words = set(normalize_name(text).split())
+    matches = {party for party in party_roles
+               if appears_in(party, text) or _distinctive_token(party) in words}
+    return matches.pop() if len(matches) == 1 else None
+
+def segment_notice_blocks(paragraph: str) -> List[NoticeBlock]:
+    """Split a notice paragraph into party, copy-to and third-party blocks at lines ending in ':'"""
+    blocks = []
+    for raw_line in paragraph.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if _HEADER.search(line) and not _NOT_A_HEADER.match(line):
+            if _COPY_HEADER.search(line):
+                kind = "copy_to"
+            elif _THIRD_PARTY_HEADER.search(line):
+                kind = "third_party"
+            else:
+                kind = "party"
+            blocks.append(NoticeBlock(kind=kind, header=line))
+        elif blocks:
+            blocks[-1].lines.append(line)
+    return blocks
+
+def resolve_notice_paragraph(paragraph: str, party_roles: Dict[str, str]) -> Optional[ParagraphAnalysis]:
+    """
+    Resolve buyer/seller/third-party counsel of a notice paragraph by rules alone
+
+    Returns None unless the paragraph is a notice section with copy-to blocks
+    and every law firm in it lands on exactly one role, so callers can fall
+    back to LLM2 whenever the rules are not confident.
+    """
+    blocks = segment_notice_blocks(paragraph)
+    if not any(block.kind == "copy_to" for block in blocks):
+        return None
+
+    parties = {}
+    previous = None
+    for block in blocks:
+        block.firms = find_law_firms("\n".join(block.lines))
+        header_roles = {_role_for(word) for word in re.findall(_ROLE_PATTERN, block.header, re.I)}
+        if len(header_roles) > 1:
+            return None
+        if block.kind == "party":
+            block.party = _match_party(block.text, party_roles)
+            if header_roles:
+                block.role = header_roles.pop()
+            elif block.party:
+                block.role = party_roles[block.party]
+            if block.role is None and not block.lines:
+                continue    # a lead-in such as "Notices shall be sent as follows:"
+            if block.firms or block.role is None:
+                return None
+            parties.setdefault(block.role, block.party)
+        elif block.kind == "third_party":
+            block.role = THIRD_PARTY
+        elif header_roles:
+            block.role = header_roles.pop()     # "If to Seller, with a copy to:"
+        elif previous is not None:
+            block.role = previous.role   # copy-to counsel acts for the block it follows
+        if block.kind != "copy_to":
+            previous = block
+
+    firms_by_role = {}
+    for block in blocks:
+        if not block.firms:
+            continue
+        if block.role is None:
+            return None
+        firms_by_role.setdefault(block.role, [])
+        for firm in block.firms:
+            if firm not in firms_by_role[block.role]:
+                firms_by_role[block.role].append(firm)
+
+    assigned = {normalize_name(f) for firms in firms_by_role.values() for f in firms}
+    every_firm = {normalize_name(f) for f in find_law_firms(paragraph)}
+    if assigned != every_firm:
+        return None
+    if any(len(firms_by_role.get(role, [])) > 1 for role in (BUYER, SELLER)):
+        return None
+    if sum(len(firms) for firms in firms_by_role.values()) != len(assigned):
+        return None   # the same firm acting for more than one role
+
+    def first(role: str) -> str:
+        return firms_by_role.get(role, [UNKNOWN])[0]
+
+    return ParagraphAnalysis(
+        buyer_firm=first(BUYER),
+        seller_firm=first(SELLER),
+        third_party="; ".join(firms_by_role.get(THIRD_PARTY, [])) or UNKNOWN,
+        contains_target=False,
+        buyer=parties.get(BUYER) or UNKNOWN,
+        seller=parties.get(SELLER) or UNKNOWN,
+    )
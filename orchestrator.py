@@ -0,0 +1,202 @@
+"""
+Orchestrator for the 3-step Target Company & Law Firm Identification workflow
+LLM1 identifies the target, the model cascade (cascade.py) extracts the
+per-paragraph law firms and compiles the roles, and target presence is
+matched locally (target_matching.py)
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Union
+from dataclasses import asdict, replace
+from agents import LLM1Agent, LLM_UNAVAILABLE
+from cascade import Extraction, ModelCascade
+from ingestion import IngestedDocument
+from revisions import DocumentStore
+from system_prompts import IRRELEVANT_QUERY_MESSAGE
+from target_matching import TargetMatcher, identify_target_locally
+
+class MultiAgentOrchestrator:
+    """Orchestrates the 3-step LLM workflow for Target Company & Law Firm Identification"""
+    
+    def __init__(self, cascade: Optional[ModelCascade] = None, extraction_cache_size: int = 256,
+                 document_store: Optional[DocumentStore] = None):
+        self.llm1 = LLM1Agent()
+        self.cascade = cascade or ModelCascade()
+        self.llm2 = self.cascade.llm2
+        self.llm3 = self.cascade.llm3
+        # Target-agnostic extractions keyed by paragraph-set hash, most recently used last
+        self.extraction_cache_size = extraction_cache_size
+        self._extractions: "OrderedDict[str, Tuple[Extraction, TargetMatcher]]" = OrderedDict()
+        self._extractions_lock = threading.Lock()
+        # Revisions of documents submitted with a document_id, for incremental re-analysis
+        self.documents = document_store or DocumentStore()
+
+    def breaker_stats(self) -> Dict[str, Any]:
+        """Circuit-breaker state per LLM stage"""
+        return {"llm1": self.llm1.breaker.stats(), "llm2": self.llm2.breaker.stats(),
+                "llm3": self.llm3.breaker.stats()}
+    
+    def process(self, user_query: str, paragraphs: List[str], document_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process user query and paragraphs through the 3-step workflow
+        
+        Args:
+            user_query: User's query to check for target company
+            paragraphs: List of paragraphs to analyze
+            document_id: Optional ID of a document submitted in revisions; only
+                paragraphs changed since the previous revision reach LLM2
+            
+        Returns:
+            Dict with final results or error message; "routing" records which
+            paragraphs were resolved by rule, small model or large model,
+            "llm_calls" the token usage (including cached prefix tokens) per call,
+            and "degraded" whether any stage was answered locally because its
+            LLM was unavailable (the stages are listed in "degraded_stages")
+        """
+        # Step 1: Check for target company
+        target_company, step1 = self._identify_target(user_query, paragraphs)
+        
+        # If no target company found, return user message
+        if target_company is None:
+            return step1
+        
+        return self._with_step1(step1, self.process_target(target_company, paragraphs, document_id))
+
+    def _identify_target(self, user_query: str, paragraphs: Optional[List[str]] = None
+                         ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Step 1: (target company, step record)
+
+        The target is None when there is nothing to search for; the record is
+        then the complete response. When LLM1 is unavailable the target is
+        taken from the query text locally (see identify_target_locally) and
+        the step is flagged degraded; a query without a recognizable company
+        gets LLM1's usual rejection.
+        """
+        try:
+            step1 = self.llm1.call(self.llm1.build_user_message(user_query))
+        except LLM_UNAVAILABLE:
+            target_company = identify_target_locally(user_query, paragraphs)
+            if target_company is None:
+                return None, {"result": IRRELEVANT_QUERY_MESSAGE, "degraded": True,
+                              "degraded_stages": ["llm1"], "llm_calls": []}
+            return target_company, {"degraded_stages": ["llm1"], "llm_calls": []}
+
+        calls = [dict(step1.usage(), stage="llm1")]
+        if step1.content.startswith("<user_message>"):
+            return None, {"result": step1.content, "llm_calls": calls}
+        # Extract target company name
+        target_company = step1.content.replace("The target company is ", "").rstrip(".")
+        return target_company, {"degraded_stages": [], "llm_calls": calls}
+
+    @staticmethod
+    def _with_step1(step1: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        result["llm_calls"] = step1["llm_calls"] + result["llm_calls"]
+        result["degraded_stages"] = step1["degraded_stages"] + result["degraded_stages"]
+        result["degraded"] = bool(result["degraded_stages"])
+        return result
+
+    def process_documents(self, user_query: str,
+                          documents: Iterable[Union[IngestedDocument, Tuple[str, Iterable[str]]]]
+                          ) -> Iterator[Tuple[Optional[str], Dict[str, Any]]]:
+        """
+        Run one query over a stream of documents and yield (document name, result) pairs
+
+        Documents are IngestedDocuments straight from ingestion.ingest (named
+        by path) or (name, paragraphs) pairs. LLM1 runs once for the whole
+        stream and documents are consumed one at a time. An irrelevant query
+        yields a single (None, result) pair without reading any document.
+        While LLM1 is unavailable only gazetteer firms and names with a legal
+        suffix are accepted as targets, as no paragraphs have been read yet.
+        """
+        target_company, step1 = self._identify_target(user_query)
+        if target_company is None:
+            yield None, step1
+            return
+        for document in documents:
+            if isinstance(document, IngestedDocument):
+                name, paragraphs = document.path, document.paragraphs
+            else:
+                name, paragraphs = document
+            # LLM1's call is reported once, with the first document
+            yield name, self._with_step1(step1, self.process_target(target_company, paragraphs))
+            step1 = dict(step1, llm_calls=[])
+
+    def process_target(self, target_company: str, paragraphs: Iterable[str],
+                       document_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Steps 2 and 3 for an already identified target company
+
+        The LLM2/LLM3 extraction does not depend on the target, so it is done
+        once per paragraph set; target presence is matched locally, making
+        further targets on the same paragraphs free of LLM calls. With a
+        document_id the extraction is incremental against the document's
+        previous revision and the result carries a "revision" record.
+        """
+        paragraphs = list(paragraphs)   # one document; generators from ingestion.py are accepted
+        revision = None
+        if document_id is None:
+            extraction, matcher, cached = self._extract(paragraphs)
+        else:
+            extraction, revision = self.documents.extract(document_id, paragraphs, self.cascade)
+            matcher, cached = TargetMatcher(paragraphs), False
+        cascade_result = extraction.cascade_result
+        matches = matcher.matches(target_company)
+        matched = {match.paragraph for match in matches}
+        analyses = [replace(analysis, contains_target=i in matched)
+                    for i, analysis in enumerate(cascade_result.analyses, 1)]
+        llm2_analysis = "\n\n".join(analysis.to_text(i) for i, analysis in enumerate(analyses, 1))
+        routing = dict(cascade_result.routing_summary(), cached=cached)
+        llm_calls = [] if cached else cascade_result.calls
+        degraded_stages = sorted(set(cascade_result.degraded))
+
+        if extraction.roles is None:
+            result = {
+                "error": "Failed to parse final JSON",
+                "raw_output": extraction.raw_json,
+                "target_company": target_company,
+                "llm2_analysis": llm2_analysis,
+                "routing": routing,
+                "llm_calls": llm_calls,
+                "degraded": bool(degraded_stages),
+                "degraded_stages": degraded_stages
+            }
+        else:
+            final_result = dict(extraction.roles, contains_target_firm=bool(matches))
+            result = {
+                "target_company": target_company,
+                "llm2_analysis": llm2_analysis,
+                "final_result": final_result,
+                "raw_json": json.dumps(final_result),
+                "target_matches": [asdict(match) for match in matches],
+                "routing": routing,
+                "llm_calls": llm_calls,
+                "degraded": bool(degraded_stages),
+                "degraded_stages": degraded_stages
+            }
+        if revision is not None:
+            result["revision"] = asdict(revision)
+        return result
+
+    def _extract(self, paragraphs: List[str]) -> Tuple[Extraction, TargetMatcher, bool]:
+        """Cached target-agnostic extraction for a paragraph set; the bool says whether it was a hit"""
+        # Prompt versions are part of the key so a prompt change never serves stale extractions
+        versions = f"{self.llm2.prompt.version}:{self.llm3.prompt.version}"
+        key = hashlib.sha256("\x00".join([versions, *paragraphs]).encode("utf-8")).hexdigest()
+        with self._extractions_lock:
+            if key in self._extractions:
+                self._extractions.move_to_end(key)
+                return (*self._extractions[key], True)
+        # Extract outside the lock so concurrent requests (see service.py) are not serialized
+        entry = (self.cascade.extract(paragraphs), TargetMatcher(paragraphs))
+        if entry[0].cascade_result.degraded or entry[0].roles is None:
+            # Never cache a degraded answer past the outage, nor a failed parse: the next request retries
+            return (*entry, False)
+        with self._extractions_lock:
+            self._extractions[key] = entry
+            if len(self._extractions) > self.extraction_cache_size:
+                self._extractions.popitem(last=False)
+        return (*entry, False)
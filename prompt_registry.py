@@ -0,0 +1,78 @@
+"""
+Prompt registry for the DeepJudge multi-agent system
+Compiles the prompts in system_prompts.py once, with a version hash per prompt
+(usable as a cache key) and a token estimate of the static system prompt. The
+system prompt never contains per-call data and LLMAgent.complete sends it
+first, so the prompt prefix is byte-identical across calls. The provider only
+caches prefixes of PROVIDER_CACHE_MIN_TOKENS or more, which the current
+prompts (roughly 270-400 tokens) do not reach, so cached_prompt_tokens stays 0
+until a prompt grows past that size
+"""
+
+import hashlib
+from dataclasses import dataclass
+from string import Formatter
+from typing import Dict, Iterable, Optional, FrozenSet
+
+from system_prompts import SYSTEM_PROMPTS
+from tokens import estimate_tokens
+
+# Shortest prompt prefix the provider serves from its prompt cache
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    name: str
+    system: str
+    user_template: str                  # str.format template for the user message
+    item_template: Optional[str]        # repeated once per item and joined into {items}
+    version: str                        # hash of system prompt and templates
+    static_tokens: int                  # estimated tokens of the system prompt (the shared prefix)
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether the system prompt is long enough for the provider's prompt cache"""
+        return self.static_tokens >= PROVIDER_CACHE_MIN_TOKENS
+
+    def render(self, items: Iterable[Dict[str, object]] = (), **fields) -> str:
+        """Build the user message; only this part varies between calls"""
+        if self.item_template is not None:
+            fields["items"] = "".join(self.item_template.format(**item) for item in items)
+        return self.user_template.format(**fields)
+
+def _template_fields(template: str) -> FrozenSet[str]:
+    return frozenset(name for _, name, _, _ in Formatter().parse(template) if name)
+
+class PromptRegistry:
+    def __init__(self):
+        self._prompts: Dict[str, CompiledPrompt] = {}
+
+    def register(self, name: str, system: str, user_template: str = "{content}",
+                 item_template: Optional[str] = None) -> CompiledPrompt:
+        if item_template is not None and "items" not in _template_fields(user_template):
+            raise ValueError(f"{name}: user template must contain {{items}} when an item template is given")
+        digest = hashlib.sha256("\x00".join([system, user_template, item_template or ""]).encode("utf-8"))
+        prompt = CompiledPrompt(
+            name=name,
+            system=system,
+            user_template=user_template,
+            item_template=item_template,
+            version=digest.hexdigest()[:12],
+            static_tokens=estimate_tokens(system),
+        )
+        self._prompts[name] = prompt
+        return prompt
+
+    def get(self, name: str) -> CompiledPrompt:
+        return self._prompts[name]
+
+    def versions(self) -> Dict[str, str]:
+        return {name: prompt.version for name, prompt in self._prompts.items()}
+
+_PARAGRAPH_ITEM = "Paragraph {number}:\n{paragraph}\n\n"
+
+REGISTRY = PromptRegistry()
+REGISTRY.register("LLM1", SYSTEM_PROMPTS["LLM1"], "{user_query}")
+REGISTRY.register("LLM2", SYSTEM_PROMPTS["LLM2"], "{items}", _PARAGRAPH_ITEM)
+REGISTRY.register("LLM2_COMPACT", SYSTEM_PROMPTS["LLM2_COMPACT"], "{items}", _PARAGRAPH_ITEM)
+REGISTRY.register("LLM3", SYSTEM_PROMPTS["LLM3"], "Paragraph analyses to compile:\n\n{analyses}")
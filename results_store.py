@@ -0,0 +1,259 @@
+"""
+Compact results store for end-to-end and batch runs
+Paragraph texts are kept once by content hash; results are compact records
+written to append-only compressed segments with an index for random access
+"""
+
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from agents import ParagraphAnalysis, UNKNOWN, parse_compact_analysis
+
+# gzip at level 1 is the default: compression dominated the write time at level 6
+# for little size gain; lzma is smaller still but several times slower to write
+CODECS = {
+    "gzip": (".gz", lambda data: gzip.compress(data, compresslevel=1), gzip.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+
+# One encoder for every stored line: json.dumps builds a new encoder per call for non-default options
+_ENCODE = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+def paragraph_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+# Exactly the layout ParagraphAnalysis.to_text renders, so reading it back needs no firm extraction
+_TEXT_BLOCK = re.compile(r"Paragraph (\d+) Analysis:\nBuyer: (.*)\nBuyer Representative: (.*)\n"
+                         r"Seller: (.*)\nSeller Representative: (.*)\nThird-Party Representation: (.*)")
+# What to_text shows for an UNKNOWN buyer, buyer firm, seller, seller firm and third party
+_SHOWN_MISSING = ("Not identified", "Not stated", "Not identified", "Not stated", "None")
+_RESERVED = set(_SHOWN_MISSING) | {UNKNOWN}
+
+def _compact_lines(text: str) -> Optional[List[str]]:
+    """
+    Compact lines for an analysis text rendered by to_text; None for anything else
+
+    The lines are only returned when to_text would render them back to the
+    same text: the blocks must tile the text, and every value must be the
+    placeholder to_text shows for that field or a plain value that survives
+    the compact line format. Checking field by field avoids re-rendering.
+    """
+    lines = []
+    position = 0
+    for match in _TEXT_BLOCK.finditer(text):
+        if match.start() != (position + 2 if lines else 0) or (lines and text[position:match.start()] != "\n\n"):
+            return None
+        number, *shown = match.groups()
+        if str(int(number)) != number:
+            return None
+        values = []
+        for value, missing in zip(shown, _SHOWN_MISSING):
+            if value == missing:
+                values.append(UNKNOWN)
+            elif value in _RESERVED or "|" in value or not value or value != value.strip():
+                return None
+            else:
+                values.append(value)
+        buyer, buyer_firm, seller, seller_firm, third_party = values
+        lines.append(ParagraphAnalysis(buyer_firm, seller_firm, third_party, False, buyer, seller)
+                     .to_compact(int(number)))
+        position = match.end()
+    return lines if position == len(text) else None
+
+def _verbose_analysis(compact_lines: List[str]) -> str:
+    analyses = parse_compact_analysis("\n".join(compact_lines))
+    return "\n\n".join(analysis.to_text(number) for number, analysis in analyses.items())
+
+def compact_output(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Orchestrator result in storage form; expand_output() restores it exactly
+
+    The verbose llm2_analysis is stored as compact lines (one per paragraph)
+    when they render back to the same text, and raw_json is dropped when it
+    is just the serialized final_result. Everything else is kept as is.
+    """
+    output = dict(result)
+    text = output.get("llm2_analysis")
+    if isinstance(text, str):
+        lines = _compact_lines(text)
+        if lines is not None:
+            del output["llm2_analysis"]
+            output["llm2_compact"] = lines
+    if "final_result" in output and output.get("raw_json") == json.dumps(output["final_result"]):
+        del output["raw_json"]
+    return output
+
+def expand_output(output: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of compact_output: the orchestrator result as it was returned"""
+    result = dict(output)
+    if "llm2_compact" in result:
+        result["llm2_analysis"] = _verbose_analysis(result.pop("llm2_compact"))
+    if "final_result" in result and "raw_json" not in result:
+        result["raw_json"] = json.dumps(result["final_result"])
+    return result
+
+@dataclass(slots=True)
+class ResultRecord:
+    record_id: str
+    test_type: str
+    timestamp: str
+    user_query: str
+    paragraph_hashes: List[str]
+    output: Dict[str, Any] = field(default_factory=dict)
+    validation: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass(slots=True)
+class IndexEntry:
+    kind: str           # "record" or "paragraph"
+    segment: int
+    offset: int         # byte offset of the compressed block in the segment
+    length: int         # compressed block length
+    position: int       # line number inside the decompressed block
+
+class ResultsStore:
+    """
+    Append-only store of ResultRecords and deduplicated paragraph texts
+
+    Records and paragraphs are buffered into blocks of JSON lines; each block
+    is compressed and appended to the current segment file, and index.jsonl
+    maps every record ID / paragraph hash to (segment, offset, length, line).
+    A get() therefore decompresses one block, and stream() walks the
+    segments block by block without loading the store into memory.
+    """
+
+    def __init__(self, directory: str, codec: str = "gzip", block_items: int = 256,
+                 segment_bytes: int = 64 * 1024 * 1024):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.directory = directory
+        self.codec = codec
+        self.block_items = block_items
+        self.segment_bytes = segment_bytes
+        self._extension, self._compress, self._decompress = CODECS[codec]
+        self._index: Dict[str, IndexEntry] = {}
+        self._pending: List[Tuple[str, str, str]] = []     # (kind, key, json line)
+        self._pending_keys = {}
+        self._block_cache: Tuple[Optional[Tuple[int, int]], List[str]] = (None, [])
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.jsonl")
+        self._load_index()
+        self._segment = max((entry.segment for entry in self._index.values()), default=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, encoding="utf-8") as index_file:
+            for line in index_file:
+                key, kind, segment, offset, length, position = json.loads(line)
+                self._index[key] = IndexEntry(kind, segment, offset, length, position)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:05d}.jsonl{self._extension}")
+
+    def _buffer(self, kind: str, key: str, payload: Dict[str, Any]):
+        self._pending_keys[key] = len(self._pending)
+        self._pending.append((kind, key, _ENCODE(payload)))
+        if len(self._pending) >= self.block_items:
+            self.flush()
+
+    def add_paragraphs(self, paragraphs: List[str]) -> List[str]:
+        """Store paragraph texts not seen before and return their content hashes"""
+        hashes = []
+        for text in paragraphs:
+            digest = paragraph_hash(text)
+            if digest not in self._index and digest not in self._pending_keys:
+                self._buffer("paragraph", digest, {"hash": digest, "text": text})
+            hashes.append(digest)
+        return hashes
+
+    def append(self, record: ResultRecord):
+        if record.record_id in self._index or record.record_id in self._pending_keys:
+            raise ValueError(f"Duplicate record ID: {record.record_id}")
+        # Shallow field dict: asdict() would deep-copy every nested output value
+        self._buffer("record", record.record_id, {name: getattr(record, name) for name in ResultRecord.__slots__})
+
+    def add_result(self, record_id: str, test_type: str, timestamp: str, user_query: str,
+                   paragraphs: List[str], output: Dict[str, Any],
+                   validation: Optional[Dict[str, Any]] = None) -> ResultRecord:
+        """Convenience wrapper: dedupe paragraphs, compact the output and append one record"""
+        record = ResultRecord(record_id, test_type, timestamp, user_query,
+                              self.add_paragraphs(paragraphs), compact_output(output), validation or {})
+        self.append(record)
+        return record
+
+    def flush(self):
+        """Compress buffered items into one block and append it to the current segment"""
+        if not self._pending:
+            return
+        block = self._compress("\n".join(line for _, _, line in self._pending).encode("utf-8"))
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(block) > self.segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+        with open(path, "ab") as segment_file:
+            offset = segment_file.tell()
+            segment_file.write(block)
+        with open(self._index_path, "a", encoding="utf-8") as index_file:
+            for position, (kind, key, _) in enumerate(self._pending):
+                entry = IndexEntry(kind, self._segment, offset, len(block), position)
+                self._index[key] = entry
+                index_file.write(json.dumps([key, kind, entry.segment, offset, entry.length, position]) + "\n")
+        self._pending.clear()
+        self._pending_keys.clear()
+
+    def close(self):
+        self.flush()
+
+    def _read_block(self, segment: int, offset: int, length: int) -> List[str]:
+        if self._block_cache[0] == (segment, offset):
+            return self._block_cache[1]
+        with open(self._segment_path(segment), "rb") as segment_file:
+            segment_file.seek(offset)
+            lines = self._decompress(segment_file.read(length)).decode("utf-8").split("\n")
+        self._block_cache = ((segment, offset), lines)
+        return lines
+
+    def _load(self, key: str) -> Dict[str, Any]:
+        if key in self._pending_keys:
+            return json.loads(self._pending[self._pending_keys[key]][2])
+        entry = self._index[key]
+        return json.loads(self._read_block(entry.segment, entry.offset, entry.length)[entry.position])
+
+    def get(self, record_id: str) -> ResultRecord:
+        """Random access to one record by ID"""
+        return ResultRecord(**self._load(record_id))
+
+    def paragraph(self, digest: str) -> str:
+        return self._load(digest)["text"]
+
+    def paragraphs_for(self, record: ResultRecord) -> List[str]:
+        return [self.paragraph(digest) for digest in record.paragraph_hashes]
+
+    def record_ids(self) -> List[str]:
+        return [key for key, entry in self._index.items() if entry.kind == "record"]
+
+    def stream(self) -> Iterator[ResultRecord]:
+        """Yield every flushed record in write order, one decompressed block at a time"""
+        blocks = sorted({(entry.segment, entry.offset, entry.length)
+                         for entry in self._index.values() if entry.kind == "record"})
+        for segment, offset, length in blocks:
+            for line in self._read_block(segment, offset, length):
+                item = json.loads(line)
+                if "record_id" in item:
+                    yield ResultRecord(**item)
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._index.values() if entry.kind == "record") + sum(
+            1 for kind, _, _ in self._pending if kind == "record")
@@ -0,0 +1,159 @@
+"""
+Versioned document store for incremental re-analysis of revised agreements
+Each submitted revision is diffed paragraph by paragraph against the previous
+version; only inserted or changed paragraphs go through LLM2, and the final
+roles are recompiled from the stored per-paragraph analyses
+"""
+
+import difflib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+
+from agents import ParagraphAnalysis
+from cascade import Extraction, ModelCascade, RoutingDecision
+from results_store import paragraph_hash
+
+@dataclass
+class DocumentVersion:
+    version: int
+    paragraph_hashes: List[str]
+    analyses: List[ParagraphAnalysis]
+    roles: Optional[Dict[str, str]]
+    raw_json: str
+    degraded: bool = False          # answered locally during an LLM outage; never reused
+
+@dataclass
+class RevisionDiff:
+    unchanged: int = 0
+    inserted: int = 0
+    changed: int = 0
+    deleted: int = 0
+
+@dataclass
+class RevisionInfo:
+    """What a submission reused; returned to the caller as "revision" """
+    document_id: str
+    version: int
+    previous_version: Optional[int]
+    paragraphs_total: int
+    paragraphs_reused: int          # earlier model analyses used instead of an LLM2 call
+    paragraphs_analyzed: int        # sent to LLM2
+    diff: RevisionDiff = field(default_factory=RevisionDiff)
+
+def diff_paragraphs(old_hashes: List[str], new_hashes: List[str]) -> RevisionDiff:
+    """Paragraph-level diff of two revisions by content hash"""
+    diff = RevisionDiff()
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            diff.unchanged += new_end - new_start
+        elif tag == "insert":
+            diff.inserted += new_end - new_start
+        elif tag == "delete":
+            diff.deleted += old_end - old_start
+        else:
+            diff.changed += min(old_end - old_start, new_end - new_start)
+            diff.inserted += max(0, (new_end - new_start) - (old_end - old_start))
+            diff.deleted += max(0, (old_end - old_start) - (new_end - new_start))
+    return diff
+
+class _Document:
+    def __init__(self):
+        self.versions: List[DocumentVersion] = []
+        # Model analyses by LLM2 prompt version and paragraph hash across all versions,
+        # so reverted or moved text is reused too
+        self.analyses: Dict[str, Tuple[ParagraphAnalysis, RoutingDecision]] = {}
+
+class DocumentStore:
+    """
+    In-memory store of document revisions and their per-paragraph analyses
+
+    Analyses are keyed by paragraph content hash, so a paragraph that is
+    unchanged, moved or reverted to an earlier wording is never sent to LLM2
+    again. Rule-pass paragraphs are not stored: the rules are recomputed for
+    the whole revision, as they cost no LLM call.
+
+    Memory is bounded for the long-running service: the least recently
+    submitted documents beyond max_documents are evicted, each document keeps
+    its last max_versions versions, and analyses are kept only for
+    paragraphs of those versions under the current LLM2 prompt.
+    """
+
+    def __init__(self, max_documents: int = 1024, max_versions: int = 16):
+        # Documents by ID, most recently submitted last
+        self._documents: "OrderedDict[str, _Document]" = OrderedDict()
+        self.max_documents = max_documents
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+
+    def latest(self, document_id: str) -> Optional[DocumentVersion]:
+        with self._lock:
+            document = self._documents.get(document_id)
+            return document.versions[-1] if document and document.versions else None
+
+    def versions(self, document_id: str) -> List[int]:
+        with self._lock:
+            document = self._documents.get(document_id)
+            return [version.version for version in document.versions] if document else []
+
+    def extract(self, document_id: str, paragraphs: List[str],
+                cascade: ModelCascade) -> Tuple[Extraction, RevisionInfo]:
+        """Analyze a revision, reusing stored analyses; records it as a new version when it changed"""
+        hashes = [paragraph_hash(paragraph) for paragraph in paragraphs]
+        # Analyses made with another LLM2 prompt version are not reused
+        keys = [f"{cascade.llm2.prompt.version}:{digest}" for digest in hashes]
+        with self._lock:
+            document = self._documents.setdefault(document_id, _Document())
+            self._documents.move_to_end(document_id)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+            previous = document.versions[-1] if document.versions else None
+            reuse = {i: document.analyses[key] for i, key in enumerate(keys) if key in document.analyses}
+
+        # LLM work happens outside the lock so other documents are not held up
+        result = cascade.analyze(paragraphs, reuse)
+        if (previous is not None and previous.roles is not None and not previous.degraded
+                and result.analyses == previous.analyses):
+            result.decisions.append(RoutingDecision("llm3", "reused",
+                                                    reasons=[f"same analyses as version {previous.version}"]))
+            roles, raw_json = previous.roles, previous.raw_json
+        else:
+            raw_json, roles = cascade.compile(result.analyses, result)
+
+        routes = [d.route for d in result.decisions if d.stage == "llm2"]
+        with self._lock:
+            for decision in result.decisions:
+                if decision.stage == "llm2" and decision.route in ("small", "large"):
+                    i = decision.paragraph - 1
+                    document.analyses[keys[i]] = (result.analyses[i], decision)
+            latest = document.versions[-1] if document.versions else None
+            degraded = bool(result.degraded)
+            if latest is None or latest.paragraph_hashes != hashes:
+                number = latest.version + 1 if latest else 1
+                latest = DocumentVersion(number, hashes, result.analyses, roles, raw_json, degraded)
+                document.versions.append(latest)
+            elif latest.degraded and not degraded:
+                # Same revision resubmitted after an outage: replace the degraded answer
+                latest = DocumentVersion(latest.version, hashes, result.analyses, roles, raw_json)
+                document.versions[-1] = latest
+            self._trim(document, cascade.llm2.prompt.version)
+
+        info = RevisionInfo(
+            document_id=document_id,
+            version=latest.version,
+            previous_version=previous.version if previous else None,
+            paragraphs_total=len(paragraphs),
+            paragraphs_reused=routes.count("reused"),
+            paragraphs_analyzed=routes.count("small") + routes.count("large"),
+            diff=diff_paragraphs(previous.paragraph_hashes if previous else [], hashes),
+        )
+        return Extraction(cascade_result=result, roles=roles, raw_json=raw_json), info
+
+    def _trim(self, document: _Document, prompt_version: str):
+        """Drop versions beyond max_versions and analyses no retained version can reuse"""
+        del document.versions[:-self.max_versions]
+        live = {f"{prompt_version}:{digest}" for version in document.versions for digest in version.paragraph_hashes}
+        for key in [key for key in document.analyses if key not in live]:
+            del document.analyses[key]
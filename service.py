@@ -0,0 +1,295 @@
+"""
+Local HTTP service for the DeepJudge multi-agent system
+Serves the interactive UI and bulk jobs side by side: each priority lane has
+its own bounded queue and worker pool (its cap on concurrent LLM work), and
+requests are shed with 429/503 instead of queueing without bound
+"""
+
+import json
+import queue
+import argparse
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+from circuit_breaker import CLOSED
+from orchestrator import MultiAgentOrchestrator
+
+INTERACTIVE, BATCH = "interactive", "batch"
+
+@dataclass
+class LaneConfig:
+    concurrency: int            # worker threads, i.e. concurrent orchestrator runs
+    max_queue_depth: int        # queued (not yet started) requests before 429
+    max_queue_wait: float       # seconds a request may wait to start before 503
+
+DEFAULT_LANES = {
+    INTERACTIVE: LaneConfig(concurrency=8, max_queue_depth=32, max_queue_wait=5.0),
+    BATCH: LaneConfig(concurrency=2, max_queue_depth=256, max_queue_wait=300.0),
+}
+
+class Rejected(Exception):
+    """Request shed by admission control; status_code is 429 or 503"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+@dataclass
+class Job:
+    query: str
+    paragraphs: list
+    lane: str
+    deadline: float
+    document_id: Optional[str] = None       # set for revisions of a stored document
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    shed: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def timings(self) -> Dict[str, Any]:
+        started = self.started_at or self.finished_at or time.monotonic()
+        timings = {"lane": self.lane, "queue_wait_ms": round((started - self.enqueued_at) * 1000, 1)}
+        if self.started_at and self.finished_at:
+            timings["processing_ms"] = round((self.finished_at - self.started_at) * 1000, 1)
+        return timings
+
+class Lane:
+    """Bounded queue plus a fixed worker pool for one priority class"""
+
+    def __init__(self, name: str, config: LaneConfig, orchestrator):
+        self.name = name
+        self.config = config
+        self.orchestrator = orchestrator
+        self.jobs: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=config.max_queue_depth)
+        self.active = 0
+        self.completed = 0
+        self.shed = 0
+        self.mean_service_time = 0.0     # exponentially weighted, seconds
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._workers = [threading.Thread(target=self._work, name=f"{name}-worker-{i}", daemon=True)
+                         for i in range(config.concurrency)]
+        for worker in self._workers:
+            worker.start()
+
+    def estimated_wait(self) -> float:
+        """Expected time before a newly queued request starts"""
+        return self.jobs.qsize() * self.mean_service_time / self.config.concurrency
+
+    def submit(self, query: str, paragraphs: list, document_id: Optional[str] = None) -> Job:
+        if self._stopping.is_set():
+            raise Rejected(503, f"{self.name} lane is shutting down", 1.0)
+        wait = self.estimated_wait()
+        if wait > self.config.max_queue_wait:
+            self._count_shed()
+            raise Rejected(503, f"{self.name} lane would exceed its queue-wait budget", wait)
+        job = Job(query=query, paragraphs=paragraphs, lane=self.name,
+                  deadline=time.monotonic() + self.config.max_queue_wait, document_id=document_id)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self._count_shed()
+            raise Rejected(429, f"{self.name} lane queue is full", max(wait, 1.0))
+        return job
+
+    def _count_shed(self):
+        with self._lock:
+            self.shed += 1
+
+    def _shed(self, job: Job):
+        job.shed = True
+        self._count_shed()
+        job.finished_at = time.monotonic()
+        job.done.set()
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                # Pass the stop signal on, for workers whose sentinel did not fit in the queue
+                try:
+                    self.jobs.put_nowait(None)
+                except queue.Full:
+                    pass
+                return
+            if self._stopping.is_set() or time.monotonic() > job.deadline:
+                # Shutting down, or waited past its budget; answering now would only add to the backlog
+                self._shed(job)
+                continue
+            with self._lock:
+                self.active += 1
+            job.started_at = time.monotonic()
+            try:
+                job.result = self.orchestrator.process(job.query, job.paragraphs, document_id=job.document_id)
+            except Exception as exc:  # surfaced to the client as a 500
+                job.error = f"{type(exc).__name__}: {exc}"
+            job.finished_at = time.monotonic()
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                elapsed = job.finished_at - job.started_at
+                self.mean_service_time = elapsed if self.completed == 1 else (
+                    0.8 * self.mean_service_time + 0.2 * elapsed)
+            job.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.jobs.qsize(),
+            "active": self.active,
+            "completed": self.completed,
+            "shed": self.shed,
+            "concurrency": self.config.concurrency,
+            "max_queue_depth": self.config.max_queue_depth,
+            "mean_service_ms": round(self.mean_service_time * 1000, 1),
+        }
+
+    def stop(self):
+        """Shed queued requests and signal the workers; never blocks on a full queue"""
+        self._stopping.set()
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._shed(job)
+        for _ in self._workers:
+            try:
+                self.jobs.put_nowait(None)
+            except queue.Full:
+                break
+
+class OrchestratorService:
+    """Admission control and priority lanes in front of a MultiAgentOrchestrator"""
+
+    def __init__(self, orchestrator=None, lanes: Optional[Dict[str, LaneConfig]] = None):
+        orchestrator = orchestrator or MultiAgentOrchestrator()
+        self.orchestrator = orchestrator
+        self.lanes = {name: Lane(name, config, orchestrator)
+                      for name, config in (lanes or DEFAULT_LANES).items()}
+
+    def handle(self, query: str, paragraphs: list, lane: str = INTERACTIVE,
+               document_id: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+        """Run one request through its lane and return (HTTP status, body); raises Rejected when shed"""
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown priority lane: {lane}")
+        job = self.lanes[lane].submit(query, paragraphs, document_id)
+        job.done.wait()
+        if job.shed:
+            raise Rejected(503, f"{lane} lane queue-wait budget exceeded", self.lanes[lane].estimated_wait())
+        if job.error:
+            return 500, {"error": job.error, "service": job.timings()}
+        return 200, dict(job.result, service=job.timings())
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def health(self) -> Dict[str, Any]:
+        """Lane stats plus per-stage circuit breakers; "degraded" while any breaker is not closed"""
+        breaker_stats = getattr(self.orchestrator, "breaker_stats", None)
+        breakers = breaker_stats() if breaker_stats else {}
+        degraded = any(breaker["state"] != CLOSED for breaker in breakers.values())
+        return {"status": "degraded" if degraded else "ok", "lanes": self.stats(), "breakers": breakers}
+
+    def stop(self):
+        for lane in self.lanes.values():
+            lane.stop()
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """POST /process {"query", "paragraphs", "priority", "document_id"}; GET /health"""
+
+    service: OrchestratorService = None
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/process":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query, paragraphs = request["query"], request["paragraphs"]
+            document_id, priority = request.get("document_id"), request.get("priority")
+            if not isinstance(query, str) or not isinstance(paragraphs, list):
+                raise ValueError("query must be a string and paragraphs a list")
+            if not all(isinstance(paragraph, str) for paragraph in paragraphs):
+                raise ValueError("paragraphs must be a list of strings")
+            if document_id is not None and not isinstance(document_id, str):
+                raise ValueError("document_id must be a string")
+            if priority is not None and not isinstance(priority, str):
+                raise ValueError("priority must be a string")
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send_json(400, {"error": f"Invalid request: {exc}"})
+            return
+
+        lane = priority or self.headers.get("X-Priority") or INTERACTIVE
+        try:
+            status, result = self.service.handle(query, paragraphs, lane, document_id)
+        except Rejected as rejected:
+            self._send_json(rejected.status_code, {"error": rejected.reason, "lane": lane},
+                            {"Retry-After": str(max(1, round(rejected.retry_after)))})
+            return
+        except ValueError as exc:
+            self._send_json(400, {"error": str(exc)})
+            return
+        self._send_json(status, result)
+
+    def log_message(self, format, *args):
+        pass  # keep stdout for the startup banner; per-request timing is in the response
+
+def make_server(service: OrchestratorService, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the DeepJudge multi-agent system over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--interactive-concurrency", type=int, default=DEFAULT_LANES[INTERACTIVE].concurrency)
+    parser.add_argument("--batch-concurrency", type=int, default=DEFAULT_LANES[BATCH].concurrency)
+    args = parser.parse_args()
+
+    lanes = {
+        INTERACTIVE: LaneConfig(args.interactive_concurrency, DEFAULT_LANES[INTERACTIVE].max_queue_depth,
+                                DEFAULT_LANES[INTERACTIVE].max_queue_wait),
+        BATCH: LaneConfig(args.batch_concurrency, DEFAULT_LANES[BATCH].max_queue_depth,
+                          DEFAULT_LANES[BATCH].max_queue_wait),
+    }
+    service = OrchestratorService(lanes=lanes)
+    server = make_server(service, args.host, args.port)
+    print(f"DeepJudge service listening on http://{args.host}:{args.port} (POST /process, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+if __name__ == "__main__":
+    main()
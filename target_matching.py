@@ -0,0 +1,189 @@
+"""
+Local fuzzy target-company matching
+Decides whether a target company is mentioned in the paragraphs without an LLM
+call, tolerating "&" vs "and", punctuation, legal suffixes, abbreviations
+("K&E") and OCR noise ("Kirk1and")
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+
+from gazetteer import find_law_firms
+
+# Tokens that carry no identity: legal-form suffixes and connectives
+_IGNORED_TOKENS = {
+    "and", "the", "of", "llp", "llc", "lp", "pllc", "pc", "plc", "inc", "incorporated", "corp",
+    "corporation", "co", "company", "ltd", "limited", "gmbh", "ag", "sa", "nv",
+}
+_OCR_DIGITS = str.maketrans({"0": "o", "1": "l", "5": "s", "8": "b", "|": "l"})
+# Letters an OCR digit (or a capital I) may stand for either way: "Gott1ieb", "CIeary"
+_OCR_LOOKALIKES = {frozenset("il")}
+_MIN_FUZZY_LENGTH = 5
+_TOKEN = re.compile(r"[a-z0-9|]+|&")
+
+DEFAULT_THRESHOLD = 0.85
+OCR_SIMILARITY = 0.95
+
+@dataclass
+class TargetMatch:
+    paragraph: int          # 1-based paragraph number
+    score: float
+    matched_text: str
+
+def _tokens(text: str) -> List[Tuple[str, int, int]]:
+    """(token, start, end) with OCR digit confusions undone inside alphabetic words"""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group(0)
+        if token == "&":
+            continue
+        if not token.isdigit() and not token.isalpha():
+            token = token.translate(_OCR_DIGITS)
+        if token not in _IGNORED_TOKENS:
+            tokens.append((token, match.start(), match.end()))
+    return tokens
+
+def _similarity(a: str, b: str) -> float:
+    """
+    1.0 for equal tokens, OCR_SIMILARITY when they differ only by OCR look-alikes, else 0.0
+
+    No other edits are tolerated: one changed letter in a short name is
+    usually a different name ("Ellison" / "Allison", "Robert" / "Roberts").
+    """
+    if a == b:
+        return 1.0
+    if len(a) != len(b) or len(a) < _MIN_FUZZY_LENGTH:
+        return 0.0
+    if all(x == y or frozenset((x, y)) in _OCR_LOOKALIKES for x, y in zip(a, b)):
+        return OCR_SIMILARITY
+    return 0.0
+
+class TargetMatcher:
+    """
+    Indexes a paragraph set once so any number of targets can be scored against it
+
+    Fuzzy comparisons run against the set's distinct vocabulary rather than
+    every token occurrence, so scoring is one pass over the paragraphs per
+    target at most.
+    """
+
+    def __init__(self, paragraphs: List[str]):
+        self.paragraphs = paragraphs
+        self._tokens = [_tokens(paragraph) for paragraph in paragraphs]
+        self._positions: Dict[str, List[Tuple[int, int]]] = {}
+        for p, tokens in enumerate(self._tokens):
+            for t, (token, _, _) in enumerate(tokens):
+                self._positions.setdefault(token, []).append((p, t))
+
+    def _candidates(self, token: str) -> Dict[str, float]:
+        """Vocabulary tokens similar enough to token, with their similarity"""
+        if token in self._positions:
+            exact = {token: 1.0}
+            if len(token) < _MIN_FUZZY_LENGTH:
+                return exact
+        else:
+            exact = {}
+        fuzzy = {word: _similarity(token, word) for word in self._positions if word != token}
+        exact.update({word: score for word, score in fuzzy.items() if score > 0})
+        return exact
+
+    def scores(self, target_company: str) -> List[Tuple[float, str]]:
+        """Best (score, matched text) per paragraph for the target company"""
+        best = [(0.0, "")] * len(self.paragraphs)
+        target = [token for token, _, _ in _tokens(target_company)]
+        if not target:
+            return best
+
+        # Full-name matches: each target token, in order, fuzzily equal to consecutive tokens
+        candidates = [self._candidates(token) for token in target]
+        for word, first_score in candidates[0].items():
+            for p, t in self._positions[word]:
+                tokens = self._tokens[p]
+                if t + len(target) > len(tokens):
+                    continue
+                total = first_score
+                for k in range(1, len(target)):
+                    similarity = candidates[k].get(tokens[t + k][0], 0.0)
+                    if similarity == 0.0:
+                        break
+                    total += similarity
+                else:
+                    score = total / len(target)
+                    if score > best[p][0]:
+                        start, end = tokens[t][1], tokens[t + len(target) - 1][2]
+                        best[p] = (score, self.paragraphs[p][start:end])
+
+        # Abbreviations: "K&E" / "CGSH" for a multi-word target. Two letters only count
+        # when joined by "&", so initials and degrees ("J.D.") do not match "Jones Day"
+        if len(target) >= 2:
+            acronym = "".join(token[0] for token in target)
+            for p, tokens in enumerate(self._tokens):
+                for t, (token, start, end) in enumerate(tokens):
+                    run = tokens[t:t + len(target)]
+                    letters = [tok for tok, _, _ in run]
+                    spelled = all(len(tok) == 1 for tok in letters) and "".join(letters) == acronym and (
+                        len(acronym) >= 3 or self.paragraphs[p][run[0][2]:run[1][1]].strip() == "&")
+                    if (len(acronym) >= 3 and token == acronym) or spelled:
+                        last = end if token == acronym else tokens[t + len(target) - 1][2]
+                        if best[p][0] < 0.9:
+                            best[p] = (0.9, self.paragraphs[p][start:last])
+        return best
+
+    def matches(self, target_company: str, threshold: float = DEFAULT_THRESHOLD) -> List[TargetMatch]:
+        return [TargetMatch(p + 1, round(score, 3), text)
+                for p, (score, text) in enumerate(self.scores(target_company)) if score >= threshold]
+
+    def contains(self, target_company: str, threshold: float = DEFAULT_THRESHOLD) -> bool:
+        return bool(self.matches(target_company, threshold))
+
+def contains_target(target_company: str, paragraphs: List[str],
+                    threshold: float = DEFAULT_THRESHOLD) -> bool:
+    """One-off check; build a TargetMatcher directly to score several targets"""
+    return TargetMatcher(paragraphs).contains(target_company, threshold)
+
+def match_targets(target_companies: List[str], paragraphs: List[str],
+                  threshold: float = DEFAULT_THRESHOLD) -> Dict[str, List[TargetMatch]]:
+    matcher = TargetMatcher(paragraphs)
+    return {target: matcher.matches(target, threshold) for target in target_companies}
+
+# Capitalized name runs in a query ("Kirkland & Ellis", "Cleary Gottlieb Steen & Hamilton LLP")
+_NAME_RUN = re.compile(r"[A-Z][\w&.'\-]*(?:,?\s+(?:&\s+|and\s+)?[A-Z][\w&.'\-]*)*")
+_QUERY_WORDS = {"is", "are", "was", "does", "did", "do", "can", "find", "check", "search", "show",
+                "whether", "please", "any", "the", "a", "an", "tell", "who", "which", "what", "what's",
+                "how", "when", "where", "why", "i"}
+_LEGAL_SUFFIXES = _IGNORED_TOKENS - {"and", "the", "of"}
+
+def _query_names(user_query: str) -> List[str]:
+    """Capitalized name runs in the query with leading question words removed"""
+    names = []
+    for run in _NAME_RUN.findall(user_query):
+        words = run.split()
+        while words and words[0].lower().strip(",") in _QUERY_WORDS:
+            words.pop(0)
+        if words:
+            names.append(" ".join(words).rstrip(".,"))
+    return names
+
+def identify_target_locally(user_query: str, paragraphs: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Target company from the query text, for when LLM1 is unavailable
+
+    Only names that are clearly companies are accepted: a firm the gazetteer
+    recognizes, a name ending in a legal suffix ("Apple Inc."), or a name
+    the TargetMatcher finds in the paragraphs. None otherwise, so an
+    off-topic query is rejected rather than turned into a search for "How".
+    """
+    firms = find_law_firms(user_query)
+    if firms:
+        return firms[0]
+    names = sorted(_query_names(user_query), key=len, reverse=True)
+    for name in names:
+        if name.split()[-1].lower().replace(".", "") in _LEGAL_SUFFIXES and len(name.split()) > 1:
+            return name
+    if paragraphs:
+        matcher = TargetMatcher(paragraphs)
+        for name in names:
+            if _tokens(name) and matcher.contains(name):
+                return name
+    return None
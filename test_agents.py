@@ -3,7 +3,8 @@ Comprehensive tests for all LLM agents in the DeepJudge Multi-Agent System
 """
 
 import json
-from agents import LLM1Agent, LLM2Agent, LLM3Agent, MultiAgentOrchestrator
+from agents import LLM1Agent, LLM2Agent, LLM3Agent
+from orchestrator import MultiAgentOrchestrator
 
 def test_llm1_agent():
     """Test LLM1 agent for target company detection"""
@@ -43,12 +44,9 @@ def test_llm2_agent():
         "This agreement shall be governed by Delaware law with dispute resolution through arbitration."
     ]
     
-    target_company = "Kirkland & Ellis"
+    print("Analyzing 4 test paragraphs (target-agnostic)...")
     
-    print(f"Target Company: {target_company}")
-    print("Analyzing 4 test paragraphs...")
-    
-    result = llm2.process(test_paragraphs, target_company)
+    result = llm2.process(test_paragraphs)
     print("LLM2 Analysis Result:")
     print(result)
     print("-" * 60)
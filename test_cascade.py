@@ -0,0 +1,192 @@
+"""
+Offline tests for the LLM2/LLM3 model cascade (no OpenAI calls are made)
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+from agents import LLM2Agent, LLM3Agent, parse_compact_analysis, parse_llm2_analysis
+from cascade import ModelCascade, compile_locally
+from gazetteer import _GAZETTEER, find_law_firms
+from llm_stubs import stub_complete
+from main import SAMPLE_PARAGRAPHS
+from notice_blocks import extract_party_roles, resolve_notice_paragraph
+
+# Sample paragraphs with the notice section rewritten as prose, so paragraph 3 needs LLM2
+PROSE_PARAGRAPHS = SAMPLE_PARAGRAPHS[:2] + [
+    "Ecolab Inc. is advised by Shearman & Sterling LLP, Purolite Corporation by Cleary Gottlieb "
+    "Steen & Hamilton LLP, and Gibson, Dunn & Crutcher LLP acts as third-party representative."
+] + SAMPLE_PARAGRAPHS[3:]
+
+SMALL_OUTPUT = """Paragraph 1 Analysis:
+Buyer: Ecolab Inc.
+Buyer Representative: Not stated
+Seller: Purolite Corporation
+Seller Representative: Not stated
+Third-Party Representation: Independent third-party representative - Gibson, Dunn & Crutcher LLP
+
+Paragraph 3 Analysis:
+Buyer: Ecolab Inc.
+Buyer Representative: Shearman & Sterling LLP
+Seller: Purolite Corporation
+Seller Representative: Kirkland & Ellis LLP
+Third-Party Representation: Gibson, Dunn & Crutcher LLP"""
+
+LARGE_OUTPUT = """Paragraph 3 Analysis:
+Buyer: Ecolab Inc.
+Buyer Representative: Shearman & Sterling LLP
+Seller: Purolite Corporation
+Seller Representative: Cleary Gottlieb Steen & Hamilton LLP
+Third-Party Representation: Gibson, Dunn & Crutcher LLP"""
+
+def make_cascade(outputs, output_format="verbose"):
+    """Cascade whose LLM2 replays canned outputs keyed by model name"""
+    calls = []
+    llm2, llm3 = LLM2Agent(output_format=output_format), LLM3Agent()
+
+    def no_llm3(*args, **kwargs):
+        raise AssertionError("LLM3 should not be called when analyses agree")
+
+    llm2.complete = stub_complete(lambda call: outputs[call.model], calls)
+    llm3.complete = no_llm3
+    return ModelCascade(llm2=llm2, llm3=llm3), calls
+
+def test_gazetteer_finds_firms():
+    """Suffix pattern and gazetteer entries both resolve to clean firm names"""
+    assert find_law_firms(SAMPLE_PARAGRAPHS[0]) == ["Gibson, Dunn & Crutcher LLP"]
+    assert find_law_firms(SAMPLE_PARAGRAPHS[1]) == []
+    assert find_law_firms("counsel Wachtell, Lipton, Rosen & Katz and Foo & Bar LLP") == [
+        "Wachtell, Lipton, Rosen & Katz", "Foo & Bar LLP"]
+
+def test_gazetteer_prefilter_matches_regex_scan():
+    """The substring pre-filter only skips gazetteer entries whose regex would not match"""
+    texts = SAMPLE_PARAGRAPHS + PROSE_PARAGRAPHS + [
+        "CLEARY GOTTLIEB STEEN &\nHAMILTON LLP, counsel to the Seller",
+        "Skadden,Arps, Slate, Meagher & Flom LLP; Davis Polk & Wardwell (New York)",
+        "sullivan-and-cromwell; Kirkland & Ellis's memo",
+    ]
+    gazetteer_firms = {firm for _, _, _, firm in _GAZETTEER}
+    for text in texts:
+        scanned = {firm for _, _, pattern, firm in _GAZETTEER if pattern.search(text)}
+        assert {firm for firm in find_law_firms(text) if firm in gazetteer_firms} == scanned
+
+def test_parse_llm2_analysis():
+    """Verbose LLM2 output parses into ParagraphAnalysis objects keyed by paragraph number"""
+    analyses = parse_llm2_analysis(SMALL_OUTPUT)
+    assert sorted(analyses) == [1, 3]
+    assert analyses[1].buyer_firm == "unknown"
+    assert analyses[1].third_party == "Gibson, Dunn & Crutcher LLP"
+    assert analyses[3].buyer == "Ecolab Inc."
+
+def test_cascade_escalates_only_inconsistent_paragraphs():
+    """Firm-free paragraphs use the rule path; a hallucinated firm escalates only its paragraph"""
+    cascade, calls = make_cascade({"gpt-4o-mini": SMALL_OUTPUT, "gpt-4o": LARGE_OUTPUT})
+    result = cascade.analyze(PROSE_PARAGRAPHS)
+
+    routes = {d.paragraph: d.route for d in result.decisions}
+    assert routes == {1: "small", 2: "rule", 3: "large", 4: "rule"}
+    assert [call.model for call in calls] == ["gpt-4o-mini", "gpt-4o"]
+    assert [call["model"] for call in result.calls] == ["gpt-4o-mini", "gpt-4o"]
+    assert "Paragraph 3:" in calls[1].user_message and "Paragraph 1:" not in calls[1].user_message
+    assert result.analyses[2].seller_firm == "Cleary Gottlieb Steen & Hamilton LLP"
+
+    raw_json, final = cascade.compile(result.analyses, result)
+    assert final == {
+        "buyer_firm": "Shearman & Sterling LLP",
+        "seller_firm": "Cleary Gottlieb Steen & Hamilton LLP",
+        "third_party": "Gibson, Dunn & Crutcher LLP",
+    }
+    summary = result.routing_summary()
+    assert summary["llm2_escalation_rate"] == 0.5
+    assert summary["llm3_route"] == "rule"
+
+def test_compile_locally_defers_conflicts():
+    """Competing buyer firms cannot be compiled locally"""
+    analyses = list(parse_llm2_analysis(SMALL_OUTPUT.replace("Not stated", "Latham & Watkins LLP", 1)).values())
+    final, reasons = compile_locally(analyses)
+    assert final is None
+    assert "conflicting buyer_firm" in reasons
+
+def test_parse_compact_analysis_is_strict():
+    """Compact lines round-trip, and malformed lines are rejected instead of guessed"""
+    verbose = parse_llm2_analysis(SMALL_OUTPUT)
+    compact = "\n".join(analysis.to_compact(number) for number, analysis in verbose.items())
+    assert parse_compact_analysis(compact) == verbose
+    assert parse_compact_analysis("2|")[2].firms() == {}
+    malformed = "1|BR=Foo LLP|BR=Bar LLP\n2|XX=Foo LLP\n3|SR=\n4|T=Foo LLP\nParagraph 5|T=Foo LLP"
+    assert sorted(parse_compact_analysis(malformed)) == [4]
+
+def test_cascade_with_compact_format():
+    """The cascade parses compact output and escalates the same paragraph"""
+    small = "1|B=Ecolab Inc.|T=Gibson, Dunn & Crutcher LLP\n3|BR=Shearman & Sterling LLP|SR=Kirkland & Ellis LLP"
+    large = "3|BR=Shearman & Sterling LLP|SR=Cleary Gottlieb Steen & Hamilton LLP|T=Gibson, Dunn & Crutcher LLP"
+    cascade, calls = make_cascade({"gpt-4o-mini": small, "gpt-4o": large}, output_format="compact")
+    result = cascade.analyze(PROSE_PARAGRAPHS)
+    assert [d.route for d in result.decisions] == ["small", "rule", "large", "rule"]
+    assert result.analyses[2].seller_firm == "Cleary Gottlieb Steen & Hamilton LLP"
+
+def test_notice_blocks_resolve_sample_paragraph():
+    """Copy-to counsel is paired with the preceding party and mapped via the recitals"""
+    party_roles = extract_party_roles(SAMPLE_PARAGRAPHS)
+    assert party_roles == {"Purolite Corporation": "seller", "Ecolab Inc.": "buyer"}
+    analysis = resolve_notice_paragraph(SAMPLE_PARAGRAPHS[2], party_roles)
+    assert analysis.buyer_firm == "Shearman & Sterling LLP"
+    assert analysis.seller_firm == "Cleary Gottlieb Steen & Hamilton LLP"
+    assert analysis.third_party == "Gibson, Dunn & Crutcher LLP"
+    assert resolve_notice_paragraph(SAMPLE_PARAGRAPHS[0], party_roles) is None
+
+def test_notice_blocks_defer_unknown_parties():
+    """Without party definitions the copy-to counsel cannot be placed, so LLM2 decides"""
+    assert resolve_notice_paragraph(SAMPLE_PARAGRAPHS[2], {}) is None
+
+def test_notice_blocks_use_copy_to_header_roles():
+    """A copy-to header naming its own party wins over the block before it; two parties defer to LLM2"""
+    lines = ["If to Buyer:", "Foo Inc.", "If to Seller, with a copy to:", "Latham & Watkins LLP"]
+    analysis = resolve_notice_paragraph("\n".join(lines), {})
+    assert analysis.seller_firm == "Latham & Watkins LLP" and analysis.buyer_firm == "unknown"
+    lines[2] = "If to Buyer or Seller, with a copy to:"
+    assert resolve_notice_paragraph("\n".join(lines), {}) is None
+
+def test_notice_blocks_skip_lead_in_header():
+    """A lead-in line ending in ':' with nothing under it does not stop the rule path"""
+    paragraph = "Notices shall be sent as follows:\n" + SAMPLE_PARAGRAPHS[2]
+    analysis = resolve_notice_paragraph(paragraph, extract_party_roles(SAMPLE_PARAGRAPHS))
+    assert analysis.buyer_firm == "Shearman & Sterling LLP"
+
+def test_cascade_skips_llm2_for_notice_paragraph():
+    """Only paragraph 1 reaches the small model on the sample data"""
+    small = SMALL_OUTPUT.split("\n\nParagraph 3")[0]
+    cascade, calls = make_cascade({"gpt-4o-mini": small})
+    result = cascade.analyze(SAMPLE_PARAGRAPHS)
+    assert [d.route for d in result.decisions] == ["small", "rule", "rule", "rule"]
+    assert "Paragraph 3:" not in calls[0].user_message
+    assert result.decisions[2].reasons == ["notice-block rules"]
+
+def test_unrecognized_firm_still_reaches_llm2():
+    """A firm outside the gazetteer and without a suffix is not mistaken for a counsel-free paragraph"""
+    paragraphs = ["Acme Corp., as the Purchaser, is represented by Weil, Gotshal & Manges.",
+                  "The closing shall take place on the tenth business day after the conditions are satisfied."]
+    small = "Paragraph 1 Analysis:\nBuyer: Acme Corp.\nBuyer Representative: Weil, Gotshal & Manges\n" \
+            "Seller: Not identified\nSeller Representative: Not stated\nThird-Party Representation: None"
+    cascade, calls = make_cascade({"gpt-4o-mini": small})
+    result = cascade.analyze(paragraphs)
+    assert [d.route for d in result.decisions] == ["small", "rule"]
+    assert result.decisions[1].reasons == ["no counsel mentioned"]
+    assert result.analyses[0].buyer_firm == "Weil, Gotshal & Manges"
+    assert len(calls) == 1
+
+if __name__ == "__main__":
+    test_gazetteer_finds_firms()
+    test_gazetteer_prefilter_matches_regex_scan()
+    test_parse_llm2_analysis()
+    test_cascade_escalates_only_inconsistent_paragraphs()
+    test_compile_locally_defers_conflicts()
+    test_parse_compact_analysis_is_strict()
+    test_cascade_with_compact_format()
+    test_notice_blocks_resolve_sample_paragraph()
+    test_notice_blocks_defer_unknown_parties()
+    test_notice_blocks_use_copy_to_header_roles()
+    test_notice_blocks_skip_lead_in_header()
+    test_cascade_skips_llm2_for_notice_paragraph()
+    test_unrecognized_firm_still_reaches_llm2()
+    print("All cascade tests passed")
@@ -0,0 +1,174 @@
+"""
+Offline tests for the per-stage circuit breakers and degraded local answering
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+from types import SimpleNamespace
+
+from openai import APIConnectionError, AuthenticationError
+
+from agents import UPSTREAM_FAILURES
+from cascade import analyze_locally, compile_by_majority
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, BreakerConfig, CircuitBreaker, CircuitOpenError
+from llm_stubs import SAMPLE_ANALYSIS, stub_complete
+from main import SAMPLE_PARAGRAPHS, SAMPLE_QUERY
+from orchestrator import MultiAgentOrchestrator
+from system_prompts import IRRELEVANT_QUERY_MESSAGE
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def failing():
+    raise APIConnectionError(request=None)
+
+def rejecting():
+    response = SimpleNamespace(request=None, status_code=401, headers={})
+    raise AuthenticationError("Incorrect API key provided", response=response, body=None)
+
+def test_breaker_trips_fails_fast_and_recovers():
+    """Error rate opens the breaker; after the cool-down one probe closes it again"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("llm2", BreakerConfig(min_calls=3, failure_rate=0.5, open_seconds=10), clock,
+                             failures=UPSTREAM_FAILURES)
+    assert breaker.call(lambda: "ok") == "ok"
+    for _ in range(2):
+        try:
+            breaker.call(failing)
+        except APIConnectionError:
+            pass
+    assert breaker.state == OPEN
+
+    try:
+        breaker.call(lambda: "never called")
+        raise AssertionError("open breaker should fail fast")
+    except CircuitOpenError as error:
+        assert error.retry_after == 10
+
+    clock.now = 11
+    try:
+        breaker.call(failing)                   # failed probe re-opens
+    except APIConnectionError:
+        pass
+    assert breaker.state == OPEN
+    clock.now = 22
+    assert breaker.call(lambda: "probe") == "probe"
+    assert breaker.state == CLOSED and breaker.stats()["rejected"] == 1
+
+def test_slow_calls_trip_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("llm1", BreakerConfig(min_calls=2, slow_call_seconds=5), clock)
+
+    def slow():
+        clock.now += 6
+        return "late"
+
+    breaker.call(slow)
+    breaker.call(slow)
+    assert breaker.state == OPEN
+    clock.now += 31
+    assert breaker.call(lambda: breaker.state) == HALF_OPEN    # the probe runs half-open
+    assert breaker.state == CLOSED
+
+def test_rejected_requests_do_not_trip_or_degrade():
+    """An authentication error is not an outage: it propagates and the breaker stays closed"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("llm1", BreakerConfig(min_calls=2), clock, failures=UPSTREAM_FAILURES)
+    for _ in range(3):
+        try:
+            breaker.call(rejecting)
+            raise AssertionError("authentication error should propagate")
+        except AuthenticationError:
+            pass
+    assert breaker.state == CLOSED and breaker.stats()["recent_calls"] == 0
+
+    orchestrator = MultiAgentOrchestrator()
+    orchestrator.llm1.complete = stub_complete(lambda call: rejecting())
+    try:
+        orchestrator.process(SAMPLE_QUERY, SAMPLE_PARAGRAPHS)
+        raise AssertionError("authentication error should not be answered in degraded mode")
+    except AuthenticationError:
+        pass
+    assert orchestrator.breaker_stats()["llm1"]["state"] == CLOSED
+
+def test_off_topic_queries_rejected_while_llm1_is_down():
+    """Without LLM1 only clear company names become targets; the baseline off-topic queries are rejected"""
+    orchestrator = MultiAgentOrchestrator()
+    orchestrator.llm1.complete = stub_complete(lambda call: failing())
+    orchestrator.llm2.complete = stub_complete(SAMPLE_ANALYSIS)
+    random_paragraphs = ["Random paragraph one", "Random paragraph two"]
+    for query in ("What is the weather today?", "How do I cook pasta?", "Tell me about machine learning",
+                  "What time is it?", "What's the capital of France?"):
+        for paragraphs in (SAMPLE_PARAGRAPHS, random_paragraphs):
+            result = orchestrator.process(query, paragraphs)
+            assert result["result"] == IRRELEVANT_QUERY_MESSAGE, (query, result)
+            assert result["degraded_stages"] == ["llm1"]
+
+    assert orchestrator.process("Is Kirkland & Ellis present?", random_paragraphs)["target_company"] == (
+        "Kirkland & Ellis LLP")
+    assert orchestrator.process("Is Apple Inc. mentioned?", random_paragraphs)["target_company"] == "Apple Inc"
+    assert orchestrator.process("Does Ecolab appear in the contract?", SAMPLE_PARAGRAPHS)["target_company"] == "Ecolab"
+    assert "result" in orchestrator.process("Does Microsoft appear in the contract?", SAMPLE_PARAGRAPHS)
+
+def test_orchestrator_degrades_then_restores():
+    """During an outage answers come from local paths flagged degraded; half-open probes restore service"""
+    clock = FakeClock()
+    orchestrator = MultiAgentOrchestrator()
+    upstream = {"up": False, "calls": 0}
+    for agent in (orchestrator.llm1, orchestrator.llm2, orchestrator.llm3):
+        agent.breaker = CircuitBreaker(type(agent).__name__, BreakerConfig(min_calls=2, open_seconds=30), clock,
+                                       failures=UPSTREAM_FAILURES)
+
+    def upstream_reply(content):
+        def reply(call):
+            upstream["calls"] += 1
+            if not upstream["up"]:
+                failing()
+            return content
+        return reply
+
+    orchestrator.llm1.complete = stub_complete(upstream_reply("The target company is Kirkland & Ellis."))
+    orchestrator.llm2.complete = stub_complete(upstream_reply(SAMPLE_ANALYSIS))
+
+    degraded = orchestrator.process(SAMPLE_QUERY, SAMPLE_PARAGRAPHS)
+    assert degraded["degraded"] is True and degraded["degraded_stages"] == ["llm1", "llm2"]
+    assert degraded["final_result"] == {
+        "buyer_firm": "Shearman & Sterling LLP",
+        "seller_firm": "Cleary Gottlieb Steen & Hamilton LLP",
+        "third_party": "Gibson, Dunn & Crutcher LLP",
+        "contains_target_firm": False,
+    }
+    orchestrator.process(SAMPLE_QUERY, SAMPLE_PARAGRAPHS)
+    assert orchestrator.breaker_stats()["llm1"]["state"] == OPEN
+
+    calls_before = upstream["calls"]
+    assert orchestrator.process(SAMPLE_QUERY, SAMPLE_PARAGRAPHS)["degraded"] is True
+    assert upstream["calls"] == calls_before      # open breakers fail fast
+
+    upstream["up"] = True
+    clock.now += 31
+    restored = orchestrator.process(SAMPLE_QUERY, SAMPLE_PARAGRAPHS)
+    assert restored["degraded"] is False and restored["target_company"] == "Kirkland & Ellis"
+    assert {stats["state"] for stats in orchestrator.breaker_stats().values()} == {CLOSED}
+
+def test_degraded_analysis_skips_parties():
+    """LLC/PC parties found by the suffix pattern are not reported as counsel"""
+    paragraph = "Acme Holdings LLC, as the Purchaser, is represented by Jones Day."
+    assert analyze_locally(paragraph).third_party == "Jones Day"
+    defined = analyze_locally("Notices to Acme Holdings LLC or Jones Day.", {"Acme Holdings LLC": "buyer"})
+    assert defined.third_party == "Jones Day"
+    assert compile_by_majority([analyze_locally(paragraph)])["third_party"] == "Jones Day"
+
+if __name__ == "__main__":
+    test_breaker_trips_fails_fast_and_recovers()
+    test_slow_calls_trip_breaker()
+    test_rejected_requests_do_not_trip_or_degrade()
+    test_off_topic_queries_rejected_while_llm1_is_down()
+    test_orchestrator_degrades_then_restores()
+    test_degraded_analysis_skips_parties()
+    print("All circuit breaker tests passed")
@@ -0,0 +1,104 @@
+"""
+Offline tests for streaming ingestion and paragraph segmentation
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+import tempfile
+import textwrap
+
+from ingestion import HEADING, NOTICE, SECTION, TEXT, IngestionStats, ingest, iter_paragraphs, segment_lines
+from llm_stubs import SAMPLE_ANALYSIS, stub_complete
+from main import SAMPLE_PARAGRAPHS
+from notice_blocks import extract_party_roles, resolve_notice_paragraph
+from orchestrator import MultiAgentOrchestrator
+
+def wrapped(paragraph, width=78):
+    return "\n".join(textwrap.wrap(paragraph, width))
+
+# The sample agreement as it looks after text extraction: wrapped lines, headings,
+# a page number, ragged whitespace and numbered sections without blank lines
+SAMPLE_DOCUMENT = "\n".join([
+    "ARTICLE I",
+    "DEFINITIONS AND PARTIES",
+    "",
+    wrapped(SAMPLE_PARAGRAPHS[0]).replace("Ecolab Inc.,", "Ecolab\u00a0 Inc.,"),
+    "",
+    wrapped(SAMPLE_PARAGRAPHS[1]),
+    "",
+    "12",
+    "Section 9.2 Notices",
+    SAMPLE_PARAGRAPHS[2].replace("One Party", "One \t Party"),
+    "9.3 Interpretation. " + wrapped(SAMPLE_PARAGRAPHS[3]),
+    "(a) Headings are for convenience only.",
+])
+
+def write_documents(directory, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"agreement-{i}.txt")
+        with open(path, "w", encoding="utf-8") as document:
+            document.write(SAMPLE_DOCUMENT)
+        paths.append(path)
+    return paths
+
+def test_segmentation_recovers_sample_paragraphs():
+    """Wrapped prose is re-joined, whitespace normalized and the notice block keeps its lines"""
+    segments = list(segment_lines(SAMPLE_DOCUMENT.splitlines()))
+    kinds = [segment.kind for segment in segments]
+    assert kinds == [HEADING, HEADING, TEXT, TEXT, HEADING, NOTICE, SECTION, SECTION]
+    texts = [segment.text for segment in segments]
+    assert texts[2:4] == SAMPLE_PARAGRAPHS[:2]
+    assert texts[5] == SAMPLE_PARAGRAPHS[2]
+    assert texts[6] == "9.3 Interpretation. " + SAMPLE_PARAGRAPHS[3]
+
+    # The segmented notice block still resolves through the rule path
+    analysis = resolve_notice_paragraph(texts[5], extract_party_roles(texts))
+    assert analysis.buyer_firm == "Shearman & Sterling LLP"
+
+def test_wrapped_cross_reference_does_not_start_a_section():
+    """A line opening with a section number continues the sentence unless the previous line closed one"""
+    lines = ["(b) The Seller shall indemnify the Buyer for all Losses arising under Section",
+             "9.2 hereof, subject to the limitations set forth in Sections 9.4 and",
+             "9.5.",
+             "9.6 Survival. The representations survive the Closing."]
+    segments = list(segment_lines(lines))
+    assert [segment.kind for segment in segments] == [SECTION, SECTION]
+    assert segments[0].text == " ".join(lines[:3])
+
+def test_process_pool_ingestion_streams_in_order():
+    """Documents come back in input order with throughput figures"""
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_documents(directory, 5)
+        stats = IngestionStats()
+        documents = list(ingest(iter(paths), workers=2, stats=stats))
+        assert [document.path for document in documents] == paths
+        assert documents[0].paragraphs == list(iter_paragraphs(paths[0]))
+        report = stats.report()
+        assert report["documents"] == 5 and report["paragraphs"] == 25
+        assert report["mb_per_s"] > 0 and report["paragraphs_per_s"] > 0
+
+def test_orchestrator_consumes_document_stream():
+    """LLM1 runs once per stream; documents come from ingest() or as (name, paragraph generator) pairs"""
+    orchestrator = MultiAgentOrchestrator()
+    calls = []
+    orchestrator.llm1.complete = stub_complete("The target company is Cleary Gottlieb.", calls)
+    orchestrator.llm2.complete = stub_complete(SAMPLE_ANALYSIS, calls)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_documents(directory, 2)
+        documents = ((path, iter_paragraphs(path)) for path in paths)
+        results = dict(orchestrator.process_documents("Is Cleary Gottlieb present?", documents))
+        ingested = dict(orchestrator.process_documents("Is Cleary Gottlieb present?", ingest(paths, workers=2)))
+    assert list(results) == list(ingested) == paths
+    assert [call.system_prompt for call in calls].count(orchestrator.llm1.system_prompt) == 2
+    for result in [*results.values(), *ingested.values()]:
+        assert result["final_result"]["seller_firm"] == "Cleary Gottlieb Steen & Hamilton LLP"
+        assert result["final_result"]["contains_target_firm"] is True
+
+if __name__ == "__main__":
+    test_segmentation_recovers_sample_paragraphs()
+    test_wrapped_cross_reference_does_not_start_a_section()
+    test_process_pool_ingestion_streams_in_order()
+    test_orchestrator_consumes_document_stream()
+    print("All ingestion tests passed")
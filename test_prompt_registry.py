@@ -0,0 +1,69 @@
+"""
+Offline tests for the compiled prompt registry and per-call prompt-cache reporting
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+from types import SimpleNamespace
+
+from agents import LLM1Agent, LLM2Agent, LLM3Agent
+from prompt_registry import REGISTRY, PromptRegistry
+from system_prompts import SYSTEM_PROMPTS
+
+class FakeCompletions:
+    """Records the messages sent and answers with fixed usage, including cached prefix tokens"""
+
+    def __init__(self):
+        self.sent = []
+
+    def create(self, model, temperature, messages, **options):
+        self.sent.append(messages)
+        usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=40,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+        message = SimpleNamespace(content="The target company is Ecolab.")
+        return SimpleNamespace(model=model, usage=usage,
+                               choices=[SimpleNamespace(message=message, logprobs=None)])
+
+def test_agents_use_registry_prompts():
+    """system_prompts.py is the only prompt source; agents hold no prompt text of their own"""
+    assert LLM1Agent().system_prompt == SYSTEM_PROMPTS["LLM1"]
+    assert LLM2Agent(output_format="compact").system_prompt == SYSTEM_PROMPTS["LLM2_COMPACT"]
+    assert LLM3Agent().system_prompt == SYSTEM_PROMPTS["LLM3"]
+    assert LLM2Agent().build_user_message(["first", "second"], [2, 4]) == (
+        "Paragraph 2:\nfirst\n\nParagraph 4:\nsecond\n\n")
+    assert LLM3Agent().build_user_message(["a", "b"]) == "Paragraph analyses to compile:\n\na\n\n---\n\nb"
+
+def test_versions_track_prompt_changes():
+    """The version hash is stable for identical prompts and changes with any edit"""
+    registry = PromptRegistry()
+    first = registry.register("X", "system", "{items}", "{value}\n")
+    assert registry.register("X", "system", "{items}", "{value}\n").version == first.version
+    assert registry.register("X", "system.", "{items}", "{value}\n").version != first.version
+    assert len(set(REGISTRY.versions().values())) == len(REGISTRY.versions())
+    assert first.static_tokens > 0
+    # Prefixes below the provider's minimum are never served from its prompt cache
+    assert not first.cacheable and not any(REGISTRY.get(name).cacheable for name in SYSTEM_PROMPTS)
+    assert registry.register("Long", "Identify the law firms. " * 300).cacheable
+
+def test_static_prefix_identical_and_cached_tokens_reported():
+    """Every call sends the same system message first and reports cached prompt tokens"""
+    agent = LLM1Agent()
+    completions = FakeCompletions()
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    responses = [agent.call(agent.build_user_message(query))
+                 for query in ("Is Ecolab present?", "Find Purolite")]
+
+    first, second = completions.sent
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPTS["LLM1"]}
+    assert first[1]["content"] != second[1]["content"]
+    usage = responses[0].usage()
+    assert usage["cached_prompt_tokens"] == 1024
+    assert usage["prompt_version"] == REGISTRY.get("LLM1").version
+    assert usage["static_prefix_tokens_estimate"] == REGISTRY.get("LLM1").static_tokens
+
+if __name__ == "__main__":
+    test_agents_use_registry_prompts()
+    test_versions_track_prompt_changes()
+    test_static_prefix_identical_and_cached_tokens_reported()
+    print("All prompt registry tests passed")
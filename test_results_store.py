@@ -0,0 +1,80 @@
+"""
+Tests for the compact, deduplicated results store
+"""
+
+import json
+import os
+import tempfile
+
+from agents import ParagraphAnalysis, UNKNOWN
+from main import SAMPLE_PARAGRAPHS, SAMPLE_QUERY
+from results_store import ResultsStore, compact_output, expand_output
+
+ANALYSES = [
+    ParagraphAnalysis(UNKNOWN, UNKNOWN, "Gibson, Dunn & Crutcher LLP", False, "Ecolab Inc.", "Purolite Corporation"),
+    ParagraphAnalysis(UNKNOWN, UNKNOWN, UNKNOWN, False),
+    ParagraphAnalysis("Shearman & Sterling LLP", "Cleary Gottlieb Steen & Hamilton LLP", UNKNOWN, False),
+]
+FINAL_RESULT = {"buyer_firm": "Shearman & Sterling LLP", "contains_target_firm": False}
+SAMPLE_OUTPUT = {
+    "target_company": "Kirkland & Ellis",
+    "llm2_analysis": "\n\n".join(analysis.to_text(i) for i, analysis in enumerate(ANALYSES, 1)),
+    "final_result": FINAL_RESULT,
+    "raw_json": json.dumps(FINAL_RESULT),
+    "routing": {"decisions": [{"stage": "llm2", "paragraph": 1, "route": "small"}], "llm2_escalation_rate": 0.0},
+}
+
+def fill(store, count):
+    for i in range(count):
+        store.add_result(f"run/{i}", "POSITIVE", f"2025-08-26T17:00:{i:02d}", SAMPLE_QUERY,
+                         SAMPLE_PARAGRAPHS, SAMPLE_OUTPUT, {"status": "SUCCESS"})
+
+def test_paragraphs_stored_once_and_output_compacted():
+    """Identical paragraph sets are kept once; the output is stored compactly and restored exactly"""
+    with tempfile.TemporaryDirectory() as directory:
+        with ResultsStore(directory, block_items=4) as store:
+            fill(store, 10)
+            record = store.get("run/7")
+            assert store.paragraphs_for(record) == SAMPLE_PARAGRAPHS
+            assert "llm2_analysis" not in record.output and "raw_json" not in record.output
+            assert record.output["llm2_compact"][2] == "3|BR=Shearman & Sterling LLP|SR=Cleary Gottlieb Steen & Hamilton LLP"
+            assert expand_output(record.output) == SAMPLE_OUTPUT
+        index_lines = open(os.path.join(directory, "index.jsonl")).read().splitlines()
+        assert sum('"paragraph"' in line for line in index_lines) == len(SAMPLE_PARAGRAPHS)
+
+def test_unrecognized_analysis_kept_verbatim():
+    """Text the compact form cannot reproduce is stored as is rather than lost"""
+    output = dict(SAMPLE_OUTPUT, llm2_analysis="Paragraph 1 Analysis:\nBuyer Representative: see schedule")
+    assert compact_output(output)["llm2_analysis"] == output["llm2_analysis"]
+    assert expand_output(compact_output(output)) == output
+    for text in (SAMPLE_OUTPUT["llm2_analysis"] + "\n\nNote: the schedule was not provided",
+                 SAMPLE_OUTPUT["llm2_analysis"].replace("Buyer: Not identified", "Buyer: None", 1)):
+        assert compact_output(dict(SAMPLE_OUTPUT, llm2_analysis=text))["llm2_analysis"] == text
+
+def test_reopen_random_access_and_streaming():
+    """Records written in several blocks are readable by ID and in order after reopening"""
+    with tempfile.TemporaryDirectory() as directory:
+        with ResultsStore(directory, codec="lzma", block_items=3) as store:
+            fill(store, 8)
+        reopened = ResultsStore(directory, codec="lzma")
+        assert len(reopened) == 8
+        assert reopened.get("run/5").timestamp == "2025-08-26T17:00:05"
+        assert [record.record_id for record in reopened.stream()] == [f"run/{i}" for i in range(8)]
+        assert not hasattr(reopened.get("run/0"), "__dict__")   # __slots__ records
+
+def test_duplicate_record_id_rejected():
+    with tempfile.TemporaryDirectory() as directory:
+        with ResultsStore(directory) as store:
+            fill(store, 1)
+            try:
+                fill(store, 1)
+                raise AssertionError("duplicate record ID should be rejected")
+            except ValueError:
+                pass
+
+if __name__ == "__main__":
+    test_paragraphs_stored_once_and_output_compacted()
+    test_unrecognized_analysis_kept_verbatim()
+    test_reopen_random_access_and_streaming()
+    test_duplicate_record_id_rejected()
+    print("All results store tests passed")
@@ -0,0 +1,87 @@
+"""
+Offline tests for incremental re-analysis of document revisions
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+import re
+
+from gazetteer import find_law_firms
+from llm_stubs import compact_orchestrator, stub_complete
+from revisions import DocumentStore, diff_paragraphs
+
+DRAFT_1 = [
+    "Shearman & Sterling LLP advised the Purchaser on the transaction.",
+    "Cleary Gottlieb Steen & Hamilton LLP represented the Seller in the negotiations.",
+    "This Agreement shall be governed by the internal laws of the State of Delaware.",
+    "Gibson, Dunn & Crutcher LLP acted as independent advisor.",
+]
+
+DRAFT_2 = DRAFT_1[:3] + [
+    "Gibson, Dunn & Crutcher LLP acted as independent advisor to the special committee.",
+    "Shearman & Sterling LLP also advised the Purchaser on the financing.",
+]
+
+def make_orchestrator(**kwargs):
+    """Orchestrator whose LLM2 answers compact lines and records the paragraphs it was sent"""
+    orchestrator = compact_orchestrator(**kwargs)
+    sent = []
+
+    def reply(call):
+        lines = []
+        for number, paragraph in re.findall(r"Paragraph (\d+):\n(.*?)\n\n", call.user_message, re.S):
+            sent.append(paragraph)
+            key = "BR" if "Purchaser" in paragraph else "SR" if "Seller" in paragraph else "T"
+            lines.append(f"{number}|{key}={find_law_firms(paragraph)[0]}")
+        return "\n".join(lines)
+
+    orchestrator.llm2.complete = stub_complete(reply)
+    return orchestrator, sent
+
+def test_diff_paragraphs():
+    diff = diff_paragraphs(["a", "b", "c", "d"], ["a", "c", "x", "d", "e"])
+    assert (diff.unchanged, diff.inserted, diff.changed, diff.deleted) == (3, 2, 0, 1)
+
+def test_revision_only_sends_changed_paragraphs():
+    """A redline with one edit and one insertion sends just those two paragraphs to LLM2"""
+    orchestrator, sent = make_orchestrator()
+    first = orchestrator.process_target("Cleary Gottlieb", DRAFT_1, document_id="spa-1")
+    assert len(sent) == 3 and first["revision"]["version"] == 1
+
+    sent.clear()
+    second = orchestrator.process_target("Cleary Gottlieb", DRAFT_2, document_id="spa-1")
+    revision = second["revision"]
+    assert sent == DRAFT_2[3:]
+    assert (revision["version"], revision["previous_version"]) == (2, 1)
+    assert (revision["paragraphs_reused"], revision["paragraphs_analyzed"]) == (2, 2)
+    assert revision["diff"] == {"unchanged": 3, "inserted": 1, "changed": 1, "deleted": 0}
+    assert second["final_result"]["buyer_firm"] == "Shearman & Sterling LLP"
+    assert second["final_result"]["contains_target_firm"] is True
+
+    sent.clear()
+    third = orchestrator.process_target("Kirkland & Ellis", DRAFT_2, document_id="spa-1")
+    assert sent == [] and third["llm_calls"] == []
+    assert third["revision"]["version"] == 2 and third["routing"]["llm3_route"] == "reused"
+    assert orchestrator.documents.versions("spa-1") == [1, 2]
+
+def test_store_evicts_documents_and_old_versions():
+    """Least recently submitted documents and versions beyond the cap are dropped with their analyses"""
+    orchestrator, sent = make_orchestrator(document_store=DocumentStore(max_documents=2, max_versions=1))
+    documents = orchestrator.documents
+    for document_id in ("a", "b", "c"):
+        orchestrator.process_target("Cleary Gottlieb", DRAFT_1, document_id=document_id)
+    assert (documents.versions("a"), documents.versions("b"), documents.versions("c")) == ([], [1], [1])
+
+    orchestrator.process_target("Cleary Gottlieb", DRAFT_2, document_id="c")
+    assert documents.versions("c") == [2]
+    assert len(documents._documents["c"].analyses) == 4     # DRAFT_1's old paragraph 4 is gone
+    sent.clear()
+    orchestrator.process_target("Cleary Gottlieb", DRAFT_1, document_id="c")
+    assert sent == [DRAFT_1[3]] and documents.versions("c") == [3]
+
+if __name__ == "__main__":
+    test_diff_paragraphs()
+    test_revision_only_sends_changed_paragraphs()
+    test_store_evicts_documents_and_old_versions()
+    print("All revision tests passed")
@@ -0,0 +1,157 @@
+"""
+Offline tests for the HTTP service's priority lanes and load shedding
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from service import BATCH, INTERACTIVE, LaneConfig, OrchestratorService, Rejected, make_server
+
+class BlockingOrchestrator:
+    """Stands in for MultiAgentOrchestrator; each call waits until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def process(self, user_query, paragraphs, document_id=None):
+        self.release.wait(5)
+        return {"final_result": {"query": user_query}, "document_id": document_id}
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.005)
+
+def make_service(orchestrator):
+    return OrchestratorService(orchestrator, lanes={
+        INTERACTIVE: LaneConfig(concurrency=1, max_queue_depth=1, max_queue_wait=5.0),
+        BATCH: LaneConfig(concurrency=1, max_queue_depth=1, max_queue_wait=5.0),
+    })
+
+def test_full_batch_lane_does_not_block_interactive():
+    """A saturated batch lane sheds with 429 while interactive requests still complete"""
+    orchestrator = BlockingOrchestrator()
+    service = make_service(orchestrator)
+    lane = service.lanes[BATCH]
+    batch = [threading.Thread(target=service.handle, args=("q", [], BATCH)) for _ in range(2)]
+    batch[0].start()
+    wait_until(lambda: lane.active == 1)
+    batch[1].start()
+    wait_until(lambda: lane.jobs.qsize() == 1)
+
+    try:
+        service.handle("q", [], BATCH)
+        raise AssertionError("third batch request should have been shed")
+    except Rejected as rejected:
+        assert rejected.status_code == 429
+
+    interactive = {}
+    thread = threading.Thread(target=lambda: interactive.update(
+        zip(("status", "body"), service.handle("interactive q", [], INTERACTIVE))))
+    thread.start()
+    wait_until(lambda: service.lanes[INTERACTIVE].active == 1)
+    orchestrator.release.set()
+    thread.join(2)
+    for batch_thread in batch:
+        batch_thread.join(2)
+
+    assert interactive["status"] == 200
+    assert interactive["body"]["service"]["lane"] == INTERACTIVE
+    assert "queue_wait_ms" in interactive["body"]["service"]
+    assert service.stats()[BATCH]["shed"] == 1
+    service.stop()
+
+def test_expired_queue_wait_is_shed_with_503():
+    """A request that cannot start within its lane's wait budget gets 503, not a late answer"""
+    orchestrator = BlockingOrchestrator()
+    service = OrchestratorService(orchestrator, lanes={
+        BATCH: LaneConfig(concurrency=1, max_queue_depth=4, max_queue_wait=0.05)})
+    first = threading.Thread(target=service.handle, args=("q", [], BATCH))
+    first.start()
+    wait_until(lambda: service.lanes[BATCH].active == 1)
+    releaser = threading.Timer(0.2, orchestrator.release.set)
+    releaser.start()
+    try:
+        service.handle("q", [], BATCH)
+        raise AssertionError("queued request should have expired")
+    except Rejected as rejected:
+        assert rejected.status_code == 503
+    first.join(2)
+    service.stop()
+
+def _status(service):
+    try:
+        return service.handle("q", [], BATCH)[0]
+    except Rejected as rejected:
+        return rejected.status_code
+
+def test_stop_does_not_block_on_a_full_queue():
+    """Stopping a lane with a busy worker and a full queue returns at once and sheds the queued request"""
+    orchestrator = BlockingOrchestrator()
+    service = make_service(orchestrator)
+    lane = service.lanes[BATCH]
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_status(service))) for _ in range(2)]
+    threads[0].start()
+    wait_until(lambda: lane.active == 1)
+    threads[1].start()
+    wait_until(lambda: lane.jobs.full())
+
+    stopper = threading.Thread(target=service.stop)
+    stopper.start()
+    stopper.join(1)
+    assert not stopper.is_alive()
+    orchestrator.release.set()
+    for thread in threads:
+        thread.join(2)
+    assert sorted(results) == [200, 503]
+    try:
+        service.handle("q", [], BATCH)
+        raise AssertionError("a stopped lane should not accept requests")
+    except Rejected as rejected:
+        assert rejected.status_code == 503
+
+def test_http_round_trip():
+    """POST /process returns the orchestrator result plus queue-wait timing"""
+    orchestrator = BlockingOrchestrator()
+    orchestrator.release.set()
+    service = make_service(orchestrator)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        request = urllib.request.Request(
+            f"{url}/process", data=json.dumps({"query": "Is K&E present?", "paragraphs": ["p"],
+                                                "priority": "batch", "document_id": "spa-7"}).encode("utf-8"))
+        body = json.loads(urllib.request.urlopen(request, timeout=5).read())
+        assert body["final_result"]["query"] == "Is K&E present?"
+        assert body["document_id"] == "spa-7"
+        assert body["service"]["lane"] == BATCH
+
+        for invalid in ({}, {"query": "q", "paragraphs": ["a", 1]},
+                        {"query": "q", "paragraphs": ["a"], "priority": ["x"]}):
+            try:
+                urllib.request.urlopen(urllib.request.Request(
+                    f"{url}/process", data=json.dumps(invalid).encode("utf-8")), timeout=5)
+                raise AssertionError(f"{invalid} should be rejected")
+            except urllib.error.HTTPError as error:
+                assert error.code == 400
+
+        health = json.loads(urllib.request.urlopen(f"{url}/health", timeout=5).read())
+        assert health["lanes"][BATCH]["completed"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+
+if __name__ == "__main__":
+    test_full_batch_lane_does_not_block_interactive()
+    test_expired_queue_wait_is_shed_with_503()
+    test_stop_does_not_block_on_a_full_queue()
+    test_http_round_trip()
+    print("All service tests passed")
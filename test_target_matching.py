@@ -0,0 +1,90 @@
+"""
+Offline tests for local target matching and target-independent extraction
+"""
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "offline-test-key")
+
+from llm_stubs import compact_orchestrator, stub_complete
+from main import SAMPLE_PARAGRAPHS
+from target_matching import TargetMatcher, contains_target, match_targets
+
+NOISY_PARAGRAPHS = [
+    "Counsel to the Purchaser: Kirk1and and Ellis L.L.P., 601 Lexington Avenue.",
+    "K&E shall deliver the closing certificate.",
+    "Copies to CGSH and to Microsoft Corp.",
+]
+
+def test_matches_spelling_variants():
+    """'&' vs 'and', punctuation, suffixes and OCR digits all match the same firm"""
+    matcher = TargetMatcher(NOISY_PARAGRAPHS)
+    matches = matcher.matches("Kirkland & Ellis LLP")
+    assert [m.paragraph for m in matches] == [1, 2]
+    assert matches[0].matched_text == "Kirk1and and Ellis"
+    assert matcher.contains("Cleary Gottlieb Steen & Hamilton")
+    assert matcher.contains("Microsoft Corporation")
+    assert not matcher.contains("Latham & Watkins")
+
+def test_near_miss_names_do_not_match():
+    """Only OCR look-alikes are tolerated; a different letter is a different name"""
+    matcher = TargetMatcher(["Ellison & Partners advised Robert Roberts.", "CIeary Gott1ieb acted for the Seller."])
+    assert not matcher.contains("Allison & Partners")
+    assert not matcher.contains("Ellisen & Partners")
+    assert [m.paragraph for m in matcher.matches("Robert")] == [1]
+    assert matcher.matches("Robert")[0].matched_text == "Robert"
+    assert not TargetMatcher(["Roberts LLP acted for the Buyer."]).contains("Robert")
+    assert not TargetMatcher(["Allison LLP acted for the Buyer."]).contains("Ellison")
+    assert matcher.matches("Cleary Gottlieb")[0].matched_text == "CIeary Gott1ieb"
+
+def test_initials_are_not_acronyms():
+    """Two spelled-out letters only abbreviate a firm when joined by '&'"""
+    signature = TargetMatcher(["By: John Smith, J.D., General Counsel"])
+    assert not signature.contains("Jones Day")
+    assert TargetMatcher(["Opinion of K & E delivered at Closing."]).contains("Kirkland & Ellis")
+    assert TargetMatcher(["Opinion of C.G.S.H. delivered at Closing."]).contains("Cleary Gottlieb Steen & Hamilton")
+
+def test_sample_paragraphs():
+    """The assignment's target is absent; the parties and counsel are found"""
+    results = match_targets(["Kirkland & Ellis", "Shearman and Sterling", "Ecolab"], SAMPLE_PARAGRAPHS)
+    assert results["Kirkland & Ellis"] == []
+    assert [m.paragraph for m in results["Shearman and Sterling"]] == [3]
+    assert [m.paragraph for m in results["Ecolab"]] == [1, 3]
+    assert not contains_target("Apple Inc.", SAMPLE_PARAGRAPHS)
+
+def test_additional_targets_cost_no_llm_calls():
+    """The second target on the same paragraphs reuses the cached extraction"""
+    orchestrator = compact_orchestrator()
+    calls = []
+    orchestrator.llm2.complete = stub_complete("1|B=Ecolab Inc.|T=Gibson, Dunn & Crutcher LLP", calls)
+
+    first = orchestrator.process_target("Kirkland & Ellis", SAMPLE_PARAGRAPHS)
+    second = orchestrator.process_target("Cleary Gottlieb", SAMPLE_PARAGRAPHS)
+    assert [call.model for call in calls] == ["gpt-4o-mini"]
+    assert first["final_result"]["contains_target_firm"] is False
+    assert second["final_result"]["contains_target_firm"] is True
+    assert second["final_result"]["seller_firm"] == "Cleary Gottlieb Steen & Hamilton LLP"
+    assert (first["routing"]["cached"], second["routing"]["cached"]) == (False, True)
+
+def test_failed_extraction_is_not_cached():
+    """An LLM3 answer that does not parse is retried on the next request instead of served from cache"""
+    orchestrator = compact_orchestrator()
+    paragraphs = ["Shearman & Sterling LLP advised the Purchaser.", "Jones Day advised the Purchaser."]
+    llm3_calls = []
+    orchestrator.llm2.complete = stub_complete("1|BR=Shearman & Sterling LLP\n2|BR=Jones Day")
+    orchestrator.llm3.complete = stub_complete("not JSON", llm3_calls)
+
+    first = orchestrator.process_target("Jones Day", paragraphs)
+    calls_after_first = len(llm3_calls)
+    second = orchestrator.process_target("Jones Day", paragraphs)
+    assert first["error"] == second["error"] == "Failed to parse final JSON"
+    assert calls_after_first > 0 and len(llm3_calls) == 2 * calls_after_first
+    assert second["routing"]["cached"] is False and second["llm_calls"]
+
+if __name__ == "__main__":
+    test_matches_spelling_variants()
+    test_near_miss_names_do_not_match()
+    test_initials_are_not_acronyms()
+    test_sample_paragraphs()
+    test_additional_targets_cost_no_llm_calls()
+    test_failed_extraction_is_not_cached()
+    print("All target matching tests passed")
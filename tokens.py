@@ -0,0 +1,25 @@
+"""
+Token-count estimates for prompts and LLM outputs
+Uses tiktoken when it is installed, otherwise a word/punctuation approximation
+"""
+
+import re
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+_PIECE = re.compile(r"[A-Za-z]{1,8}|\d{1,3}|[^\sA-Za-z\d]")
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text for gpt-4o family models"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text))
+    # BPE vocabularies keep common words whole and split long words and digit runs
+    return len(_PIECE.findall(text))